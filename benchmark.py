@@ -0,0 +1,624 @@
+"""Benchmark the admin routes against an in-process stand-in for the Realtime Database.
+
+Nothing touches the production database: `firebase_admin.db.reference` is replaced by
+FakeDatabase, which holds a synthetic `Data/*` tree in memory, answers the same
+reference/query calls as the Admin SDK and counts the bytes each call would move.
+
+    python benchmark.py                                   # default sizes, every scenario
+    python benchmark.py --orders 20000 --users 2000 --requests 100
+    python benchmark.py --scenario orders --scenario user-orders --latency-ms 40
+    python benchmark.py --output before.json              # save results ...
+    python benchmark.py --baseline before.json            # ... and fail on p95 regressions
+
+Each scenario is requested once cold, then --requests times with random ids from the
+dataset. Reported per scenario: latency percentiles, database calls and bytes per request
+(response payloads read plus bodies written), and the peak Python memory of one request
+measured with tracemalloc.
+"""
+import argparse
+import collections
+import copy
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import firebase_admin
+import google.auth.credentials
+from firebase_admin import credentials
+from firebase_admin import db
+
+DATABASE_URL = 'https://benchmark.invalid'
+
+
+#################################################################################################################################
+#                                         FAKE REALTIME DATABASE                                                                #
+#################################################################################################################################
+
+
+def value_rank(value):
+    """Sort key following the Realtime Database ordering: null, false, true, numbers, strings, objects"""
+    if value is None:
+        return (0, 0)
+    if value is False:
+        return (1, 0)
+    if value is True:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
+
+
+def payload_size(value):
+    return len(json.dumps(value, separators=(',', ':'), default=str)) if value is not None else 0
+
+
+class Event:
+    """Streaming event passed to listen() callbacks, shaped like firebase_admin.db.Event"""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type
+        self.path = path
+        self.data = data
+
+
+class Registration:
+    def __init__(self, database, listener):
+        self.database = database
+        self.listener = listener
+
+    def close(self):
+        with self.database.lock:
+            if self.listener in self.database.listeners:
+                self.database.listeners.remove(self.listener)
+
+
+class FakeDatabase:
+    """Thread-safe in-memory tree answering the subset of the Admin SDK used by the controller"""
+
+    def __init__(self, data=None, latency=0.0):
+        self.data = data or {}
+        self.latency = latency  # Simulated round trip per call (seconds)
+        self.lock = threading.RLock()
+        self.listeners = []  # [root_path, callback]
+        self.calls = collections.Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.push_counter = 0
+
+    def reference(self, path='/', app=None, url=None):
+        return FakeReference(self, path)
+
+    @staticmethod
+    def split(path):
+        return [part for part in path.strip('/').split('/') if part]
+
+    def lookup(self, path):
+        node = self.data
+        for part in self.split(path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def put(self, path, value):
+        """Replace the value at path; None deletes it and prunes empty parents. Caller holds the lock."""
+        parts = self.split(path)
+        if not parts:
+            self.data = copy.deepcopy(value) if isinstance(value, dict) else {}
+            return
+        trail = [self.data]
+        for part in parts[:-1]:
+            child = trail[-1].get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = trail[-1][part] = {}
+            trail.append(child)
+        if value is None or value == {}:
+            trail[-1].pop(parts[-1], None)
+            # Like the real database, parents left without children disappear
+            for depth in range(len(trail) - 1, 0, -1):
+                if trail[depth]:
+                    break
+                trail[depth - 1].pop(parts[depth - 1], None)
+        else:
+            trail[-1][parts[-1]] = copy.deepcopy(value)
+
+    def record(self, operation, read=None, written=None):
+        self.calls[operation] += 1
+        self.bytes_read += payload_size(read)
+        self.bytes_written += payload_size(written)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls.clear()
+            self.bytes_read = 0
+            self.bytes_written = 0
+
+    def write(self, path, changes, merge):
+        """Apply {relative_path: value} at path and notify listeners. Caller holds the lock."""
+        base = '/'.join(self.split(path))
+        for relative, value in changes.items():
+            self.put(f'{base}/{relative}'.strip('/'), value)
+        for listener in list(self.listeners):
+            root, callback = listener
+            if base == root or base.startswith(root + '/'):
+                relative_base = base[len(root):]
+                if merge:
+                    callback(Event('patch', relative_base or '/', copy.deepcopy(changes)))
+                else:
+                    callback(Event('put', relative_base or '/', copy.deepcopy(changes[''])))
+            elif not base or root.startswith(base + '/'):
+                callback(Event('put', '/', copy.deepcopy(self.lookup(root))))
+
+    def listen(self, path, callback):
+        root = '/'.join(self.split(path))
+        listener = [root, callback]
+        with self.lock:
+            self.listeners.append(listener)
+            callback(Event('put', '/', copy.deepcopy(self.lookup(root))))
+        return Registration(self, listener)
+
+    def next_push_id(self):
+        self.push_counter += 1
+        return f'-Bench{int(time.time() * 1000):013d}{self.push_counter:07d}'
+
+
+class FakeReference:
+    def __init__(self, database, path):
+        self.database = database
+        self.path = '/' + '/'.join(database.split(path))
+        self.key = self.path.rsplit('/', 1)[-1] or None
+
+    def child(self, path):
+        return FakeReference(self.database, f'{self.path}/{path}')
+
+    def get(self, etag=False, shallow=False):
+        with self.database.lock:
+            value = self.database.lookup(self.path)
+            if shallow and isinstance(value, dict):
+                value = {key: True for key in value}
+            else:
+                value = copy.deepcopy(value)
+        self.database.record('shallow' if shallow else 'get', read=value)
+        if etag:
+            return value, str(hash(json.dumps(value, sort_keys=True, default=str)))
+        return value
+
+    def set(self, value):
+        with self.database.lock:
+            self.database.write(self.path, {'': value}, merge=False)
+        self.database.record('set', written=value)
+
+    def update(self, value):
+        changes = {key.strip('/'): child for key, child in value.items()}
+        with self.database.lock:
+            if all('/' not in key for key in changes):
+                self.database.write(self.path, changes, merge=True)
+            else:
+                # Multi-location update: each path is written as its own put
+                for key, child in changes.items():
+                    self.database.write(f'{self.path}/{key}', {'': child}, merge=False)
+        self.database.record('update', written=value)
+
+    def delete(self):
+        with self.database.lock:
+            self.database.write(self.path, {'': None}, merge=False)
+        self.database.record('delete')
+
+    def push(self, value=''):
+        with self.database.lock:
+            ref = self.child(self.database.next_push_id())
+        ref.set(value)
+        return ref
+
+    def listen(self, callback):
+        return self.database.listen(self.path, callback)
+
+    def order_by_child(self, path):
+        return FakeQuery(self, lambda key, value: self.child_value(value, path))
+
+    def order_by_key(self):
+        return FakeQuery(self, lambda key, value: key)
+
+    def order_by_value(self):
+        return FakeQuery(self, lambda key, value: value)
+
+    @staticmethod
+    def child_value(value, path):
+        for part in path.strip('/').split('/'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+
+class FakeQuery:
+    def __init__(self, ref, order_key):
+        self.ref = ref
+        self.order_key = order_key
+        self.start = self.end = None
+        self.first = self.last = None
+
+    def start_at(self, value):
+        self.start = value
+        return self
+
+    def end_at(self, value):
+        self.end = value
+        return self
+
+    def equal_to(self, value):
+        self.start = self.end = value
+        return self
+
+    def limit_to_first(self, limit):
+        self.first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self.last = limit
+        return self
+
+    def get(self):
+        with self.ref.database.lock:
+            node = self.ref.database.lookup(self.ref.path)
+            rows = list(node.items()) if isinstance(node, dict) else []
+            rows.sort(key=lambda row: (value_rank(self.order_key(*row)), row[0]))
+            if self.start is not None:
+                rows = [row for row in rows if value_rank(self.order_key(*row)) >= value_rank(self.start)]
+            if self.end is not None:
+                rows = [row for row in rows if value_rank(self.order_key(*row)) <= value_rank(self.end)]
+            if self.first is not None:
+                rows = rows[:self.first]
+            if self.last is not None:
+                rows = rows[-self.last:]
+            result = collections.OrderedDict(copy.deepcopy(rows))
+        self.ref.database.record('query', read=result)
+        return result
+
+
+class BenchmarkCredential(credentials.Base):
+    """Credential for the stand-in app; nothing is ever sent to Google"""
+
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+
+#################################################################################################################################
+#                                         SYNTHETIC DATA                                                                        #
+#################################################################################################################################
+
+
+PRODUCE = ['apple', 'banana', 'carrot', 'durian', 'eggplant', 'garlic', 'lychee', 'mango', 'onion', 'papaya',
+           'pepper', 'potato', 'rambutan', 'rice', 'spinach', 'tea', 'coffee', 'honey', 'milk', 'yogurt']
+WORDS = ['fresh', 'organic', 'sweet', 'local', 'ripe', 'crisp', 'seasonal', 'farm', 'premium', 'dried']
+ORDER_STATUSES = ['PENDING', 'PAID', 'CANCELLED']
+
+
+def generate_dataset(categories=8, items=40, orders=2000, users=300, reviews=5, sold_days=60,
+                     likes=5, coupons=50, seed=1):
+    """Build a `{'Data': ...}` tree shaped like the production database.
+
+    items, reviews and likes are averages per category, per item and per user.
+    Orders and reviews are spread over the last sold_days days.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    now_ms = int(now.timestamp() * 1000)
+    span_ms = max(sold_days, 1) * 24 * 3600 * 1000
+    data = {key: {} for key in ['Categories', 'CategoriesItems', 'OrderBills', 'Users', 'Coupons',
+                                'SoldItems', 'Reviews', 'LikedItems']}
+
+    products = []
+    for c in range(categories):
+        category_id = f'cat{c:03d}'
+        data['Categories'][category_id] = {
+            'Id': category_id,
+            'Name': f'{PRODUCE[c % len(PRODUCE)].title()} {c}',
+            'Season': rng.choice(['spring', 'summer', 'autumn', 'winter', 'all']),
+            'Image': f'drawable/{PRODUCE[c % len(PRODUCE)]}',
+        }
+        category_items = data['CategoriesItems'][category_id] = {}
+        for i in range(max(1, int(rng.gauss(items, items / 4)))):
+            item_id = f'{category_id}item{i:04d}'
+            name = f'{rng.choice(WORDS).title()} {rng.choice(PRODUCE)} {i}'
+            category_items[item_id] = {
+                'Id': item_id,
+                'Name': name,
+                'Description': ' '.join(rng.choice(WORDS) for _ in range(12)),
+                'Price': round(rng.uniform(0.5, 60), 2),
+                'Unit': rng.choice(['kg', 'bag', 'box', 'bottle']),
+                'Inventory': rng.randint(0, 500),
+                'Image': f'drawable/{rng.choice(PRODUCE)}',
+                'Type': category_id,
+                'Quantity': 0,
+            }
+            products.append((category_id, item_id, name, category_items[item_id]['Price']))
+
+    user_ids = [f'user{u:05d}' for u in range(users)]
+    for index, user_id in enumerate(user_ids):
+        data['Users'][user_id] = {
+            'Email': f'{user_id}@example.com',
+            'FirstName': rng.choice(['An', 'Binh', 'Chi', 'Dung', 'Hoa', 'Lan', 'Minh', 'Nam']),
+            'LastName': rng.choice(['Nguyen', 'Tran', 'Le', 'Pham', 'Hoang', 'Vu']),
+            'PhoneNumber': f'09{index:08d}',
+            'address': f'{rng.randint(1, 300)} Farm Road',
+            'orderBills': {},
+        }
+
+    for o in range(orders):
+        order_id = f'order{o:07d}'
+        user_id = rng.choice(user_ids) if user_ids else 'anonymous'
+        lines = {}
+        total = 0.0
+        for category_id, item_id, name, price in rng.sample(products, min(len(products), rng.randint(1, 5))):
+            quantity = rng.randint(1, 4)
+            total += quantity * price
+            lines[item_id] = {'Id': f'{category_id}/{item_id}', 'Name': name, 'image': 'drawable/apple',
+                              'quantity': quantity, 'salePrice': price}
+        data['OrderBills'][order_id] = {
+            'orderBillId': order_id,
+            'orderDate': now_ms - rng.randrange(span_ms),
+            'status': rng.choice(ORDER_STATUSES),
+            'totalPrice': round(total, 2),
+            'userUId': user_id,
+            'items': lines,
+        }
+        if user_id in data['Users']:
+            data['Users'][user_id]['orderBills'][order_id] = True
+
+    for category_id, item_id, _, _ in products:
+        count = rng.randint(0, reviews * 2)
+        if count:
+            data['Reviews'].setdefault(category_id, {})[item_id] = {
+                f'review{r:05d}': {
+                    'rating': rng.choice([1, 2, 3, 4, 4, 5, 5, 5]),
+                    'comment': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40))),
+                    'timestamp': now_ms - rng.randrange(span_ms),
+                    'userName': rng.choice(user_ids) if user_ids else 'anonymous',
+                } for r in range(count)
+            }
+
+    for day in range(sold_days):
+        date = (now - timedelta(days=day)).strftime('%Y-%m-%d')
+        data['SoldItems'][date] = {
+            f'sale{s:04d}': {'Id': f'{category_id}/{item_id}', 'Sales': rng.randint(1, 20)}
+            for s, (category_id, item_id, _, _) in enumerate(rng.sample(products, min(len(products), 30)))
+        }
+
+    for user_id in user_ids:
+        for category_id, item_id, name, price in rng.sample(products, min(len(products), rng.randint(0, likes * 2))):
+            data['LikedItems'].setdefault(user_id, {})[item_id] = {
+                'Id': f'{category_id}/{item_id}', 'Name': name, 'Price': price, 'image': 'drawable/apple'}
+
+    for k in range(coupons):
+        start = now + timedelta(days=rng.randint(-90, 30))
+        coupon_id = f'coupon{k:04d}'
+        category_id, item_id, _, _ = rng.choice(products)
+        data['Coupons'][coupon_id] = {
+            'Id': coupon_id,
+            'description': f'{rng.randint(5, 50)}% off {rng.choice(WORDS)} produce',
+            'couponType': rng.choice(['percentage', 'fixed']),
+            'discountValue': rng.randint(1, 50),
+            'startDate': start.strftime('%Y-%m-%d'),
+            'endDate': (start + timedelta(days=rng.randint(1, 60))).strftime('%Y-%m-%d'),
+            'productId': f'{category_id}/{item_id}',
+        }
+
+    return {'Data': data}
+
+
+#################################################################################################################################
+#                                         SCENARIOS                                                                             #
+#################################################################################################################################
+
+
+def pick(rng, tree, *keys):
+    """Random child key of Data/<keys...>, or a placeholder when the node is empty"""
+    node = tree['Data']
+    for key in keys:
+        node = node.get(key) or {}
+    return rng.choice(list(node)) if node else 'missing'
+
+
+def pick_item(rng, tree):
+    category_id = pick(rng, tree, 'CategoriesItems')
+    return category_id, pick(rng, tree, 'CategoriesItems', category_id)
+
+
+def pick_reviewed_item(rng, tree):
+    category_id = pick(rng, tree, 'Reviews')
+    return category_id, pick(rng, tree, 'Reviews', category_id)
+
+
+# name -> function(rng, tree) returning the URL to request
+SCENARIOS = collections.OrderedDict([
+    ('dashboard', lambda rng, tree: '/'),
+    ('categories', lambda rng, tree: '/categories'),
+    ('category', lambda rng, tree: f"/categories/{pick(rng, tree, 'Categories')}"),
+    ('all-items', lambda rng, tree: '/all-items'),
+    ('item-edit', lambda rng, tree: '/categories/{}/items/{}/edit'.format(*pick_item(rng, tree))),
+    ('orders', lambda rng, tree: '/orders'),
+    ('orders-by-status', lambda rng, tree: f"/orders?status={rng.choice(ORDER_STATUSES)}"),
+    ('order-details', lambda rng, tree: f"/orders/{pick(rng, tree, 'OrderBills')}/details"),
+    ('users', lambda rng, tree: '/users'),
+    ('user', lambda rng, tree: f"/users/{pick(rng, tree, 'Users')}"),
+    ('user-orders', lambda rng, tree: f"/users/{pick(rng, tree, 'Users')}/orders"),
+    ('coupons', lambda rng, tree: '/coupons'),
+    ('coupons-active', lambda rng, tree: '/coupons?view=active'),
+    ('liked-items', lambda rng, tree: '/liked-items'),
+    ('likes-leaderboard', lambda rng, tree: '/liked-items/leaderboard'),
+    ('reviews', lambda rng, tree: '/reviews'),
+    ('item-reviews', lambda rng, tree: '/reviews/{}/{}'.format(*pick_reviewed_item(rng, tree))),
+    ('sold-items', lambda rng, tree: '/sold-items'),
+    ('sold-items-day', lambda rng, tree: f"/sold-items/{pick(rng, tree, 'SoldItems')}"),
+    ('search', lambda rng, tree: f"/search?q={rng.choice(PRODUCE)}"),
+    ('api-orders', lambda rng, tree: '/api/orders'),
+    ('export-orders', lambda rng, tree: '/export/orders.csv'),
+])
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def timed_request(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    response.get_data()  # Drain streamed bodies (exports) inside the timing
+    return time.perf_counter() - started, response.status_code
+
+
+def run_scenario(controller, database, client, name, url_for, tree, requests, rng, no_cache):
+    """Request one scenario cold, then `requests` times; return its result row"""
+    def clear_caches():
+        if no_cache:
+            controller.firebase_cache.clear()
+            controller.page_cache.clear()
+
+    controller.firebase_cache.clear()
+    controller.page_cache.clear()
+    first, _ = timed_request(client, url_for(rng, tree))
+
+    database.reset_counters()
+    latencies = []
+    errors = 0
+    for _ in range(requests):
+        clear_caches()
+        elapsed, status = timed_request(client, url_for(rng, tree))
+        latencies.append(elapsed)
+        errors += status >= 400
+    calls = sum(database.calls.values())
+    bytes_moved = database.bytes_read + database.bytes_written
+
+    clear_caches()
+    url = url_for(rng, tree)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    client.get(url).get_data()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'requests': requests,
+        'errors': errors,
+        'first_ms': first * 1000,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'db_calls_per_request': calls / max(requests, 1),
+        'db_kb_per_request': bytes_moved / 1024 / max(requests, 1),
+        'peak_kb': peak / 1024,
+    }
+
+
+def print_report(rows, regressions=()):
+    header = ('scenario', 'first', 'p50', 'p95', 'p99', 'max', 'calls/req', 'KB/req', 'peak KB', 'errors')
+    print(f'{header[0]:<20}' + ''.join(f'{title:>11}' for title in header[1:]))
+    for row in rows:
+        flag = '  <- p95 regression' if row['scenario'] in regressions else ''
+        print(f"{row['scenario']:<20}"
+              f"{row['first_ms']:>11.1f}{row['p50_ms']:>11.1f}{row['p95_ms']:>11.1f}{row['p99_ms']:>11.1f}"
+              f"{row['max_ms']:>11.1f}{row['db_calls_per_request']:>11.1f}{row['db_kb_per_request']:>11.1f}"
+              f"{row['peak_kb']:>11.0f}{row['errors']:>11}{flag}")
+    print('Latencies in milliseconds; KB/req counts payloads read from and written to the database.')
+
+
+def find_regressions(rows, baseline_path, tolerance):
+    """Scenarios whose p95 grew by more than tolerance (a fraction) over a saved run"""
+    with open(baseline_path) as baseline_file:
+        baseline = {row['scenario']: row for row in json.load(baseline_file)['results']}
+    regressions = []
+    for row in rows:
+        before = baseline.get(row['scenario'])
+        # Ignore sub-millisecond noise
+        if before and row['p95_ms'] > max(before['p95_ms'] * (1 + tolerance), before['p95_ms'] + 1.0):
+            regressions.append(row['scenario'])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sizes = parser.add_argument_group('dataset')
+    sizes.add_argument('--categories', type=int, default=8)
+    sizes.add_argument('--items', type=int, default=40, help='items per category (average)')
+    sizes.add_argument('--orders', type=int, default=2000)
+    sizes.add_argument('--users', type=int, default=300)
+    sizes.add_argument('--reviews', type=int, default=5, help='reviews per item (average)')
+    sizes.add_argument('--sold-days', type=int, default=60)
+    sizes.add_argument('--likes', type=int, default=5, help='liked items per user (average)')
+    sizes.add_argument('--coupons', type=int, default=50)
+    sizes.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=30, help='timed requests per scenario')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='run only these scenarios (repeatable)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated round trip per database call')
+    parser.add_argument('--no-cache', action='store_true', help='clear the read and page caches before every request')
+    parser.add_argument('--mirror', action='store_true', help='serve reads from the live mirror (FIREBASE_MIRROR=1)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare p95 latencies against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth over the baseline (fraction)')
+    args = parser.parse_args(argv)
+
+    tree = generate_dataset(args.categories, args.items, args.orders, args.users, args.reviews,
+                            args.sold_days, args.likes, args.coupons, args.seed)
+    database = FakeDatabase(copy.deepcopy(tree), latency=args.latency_ms / 1000)
+    db.reference = database.reference
+    firebase_admin.initialize_app(BenchmarkCredential(), {'databaseURL': DATABASE_URL})
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import firebase_admin_controller as controller
+    controller.create_app({'FIREBASE_MIRROR': args.mirror, 'FIREBASE_TUNED_TRANSPORT': False,
+                           'SLOW_REQUEST_SECONDS': float('inf')})
+    controller.start_background_tasks()
+    client = controller.app.test_client()
+
+    print(f"Dataset: {payload_size(tree) / 1024 / 1024:.1f} MB JSON, "
+          f"{sum(len(items) for items in tree['Data']['CategoriesItems'].values())} items, "
+          f"{len(tree['Data']['OrderBills'])} orders, {len(tree['Data']['Users'])} users"
+          f"{', mirror on' if args.mirror else ''}{', caches cleared per request' if args.no_cache else ''}")
+
+    rng = random.Random(args.seed)
+    rows = []
+    try:
+        for name in args.scenario or SCENARIOS:
+            rows.append(run_scenario(controller, database, client, name, SCENARIOS[name], tree,
+                                     args.requests, rng, args.no_cache))
+    finally:
+        controller.stop_background_tasks()
+
+    regressions = find_regressions(rows, args.baseline, args.tolerance) if args.baseline else []
+    print_report(rows, regressions)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    print(f'Process peak RSS: {max_rss:.0f} MB')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'arguments': vars(args), 'max_rss_mb': max_rss, 'results': rows}, output, indent=2)
+    if regressions:
+        print(f"p95 regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
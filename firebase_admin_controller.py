@@ -1,54 +1,1112 @@
-from flask import Flask, jsonify, render_template, url_for, request, redirect, flash
+from flask import Flask, Response, jsonify, render_template, url_for, request, redirect, flash, stream_with_context
+from flask import g, send_from_directory, session
+from flask import before_render_template, template_rendered
 import firebase_admin
 from firebase_admin import credentials
 from firebase_admin import db
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+import base64
+import copy
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import heapq
+import bisect
+import click
+import json
+import mimetypes
 import os
+import re
+import threading
+import time
+import zipfile
+from urllib.parse import urlsplit
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 import shutil
+import tempfile
+from PIL import Image, ImageOps
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:  # Windows: background jobs then assume a single server process
+    fcntl = None
+try:
+    import brotli
+except ImportError:  # Optional: static files are then precompressed with gzip only
+    brotli = None
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Set a secret key for session management
-app.secret_key = 'your-super-secret-key-12345'  # In production, use a secure random key
+# Default settings; each one can be overridden from the environment or through create_app(config)
+app.config.from_mapping(
+    # Set a secret key for session management (in production, use a secure random key)
+    SECRET_KEY=os.environ.get('SECRET_KEY', 'your-super-secret-key-12345'),
+    # Firebase Admin SDK service account credentials and database
+    FIREBASE_CREDENTIALS=os.environ.get('FIREBASE_CREDENTIALS',
+                                        'appmuahangnongsan-firebase-adminsdk-fbsvc-28daa7524a.json'),
+    FIREBASE_DATABASE_URL=os.environ.get('FIREBASE_DATABASE_URL',
+                                         'https://appmuahangnongsan-default-rtdb.asia-southeast1.firebasedatabase.app'),
+    # Optional live mirror of the database fed by streaming listeners
+    FIREBASE_MIRROR=os.environ.get('FIREBASE_MIRROR') == '1',
+    # REST transport: per-call timeout (seconds), pooled keep-alive connections per host, retries on 5xx/connection errors
+    FIREBASE_HTTP_TIMEOUT=float(os.environ.get('FIREBASE_HTTP_TIMEOUT', 30)),
+    FIREBASE_POOL_SIZE=int(os.environ.get('FIREBASE_POOL_SIZE', 16)),
+    FIREBASE_RETRIES=int(os.environ.get('FIREBASE_RETRIES', 3)),
+    FIREBASE_RETRY_BACKOFF=float(os.environ.get('FIREBASE_RETRY_BACKOFF', 0.3)),
+    # Set to 0 to keep the SDK's own HTTP adapter (no pool cap, retries or transport metrics)
+    FIREBASE_TUNED_TRANSPORT=os.environ.get('FIREBASE_TUNED_TRANSPORT', '1') != '0',
+    UPLOAD_FOLDER=os.environ.get('UPLOAD_FOLDER', 'static/images'),
+    MAX_CONTENT_LENGTH=2 * 1024 * 1024,  # 2MB max file size
+    # Bulk item imports upload a manifest plus a zip of images
+    IMPORT_MAX_CONTENT_LENGTH=int(os.environ.get('IMPORT_MAX_CONTENT_LENGTH', 200 * 1024 * 1024)),
+    # Folder for the lock files that pick one worker per host to run background jobs
+    LOCK_FOLDER=os.environ.get('LOCK_FOLDER', tempfile.gettempdir()),
+    # Delete coupons this many days after they expire (unset: never purge)
+    COUPON_PURGE_AFTER_DAYS=int(os.environ['COUPON_PURGE_AFTER_DAYS']) if os.environ.get('COUPON_PURGE_AFTER_DAYS') else None,
+    # Dashboard counters are rebuilt from Firebase when older than this (seconds) and the dashboard is viewed
+    DASHBOARD_RECONCILE_SECONDS=int(os.environ.get('DASHBOARD_RECONCILE_SECONDS', 300)),
+    # Requests slower than this (seconds) are logged with a Firebase/render breakdown
+    SLOW_REQUEST_SECONDS=float(os.environ.get('SLOW_REQUEST_SECONDS', 1.0)),
+)
 
-# Initialize Firebase Admin SDK with your service account credentials
-cred = credentials.Certificate('appmuahangnongsan-firebase-adminsdk-fbsvc-28daa7524a.json')
-firebase_admin.initialize_app(cred, {
-    'databaseURL': 'https://appmuahangnongsan-default-rtdb.asia-southeast1.firebasedatabase.app'
-})
-
-# Add these constants after the app initialization
-UPLOAD_FOLDER = 'static/images'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024  # 2MB max file size
+
+# Orders pagination
+ORDER_STATUSES = ['PENDING', 'PAID', 'CANCELLED']
+ORDERS_PAGE_SIZE = 25
+ORDERS_MAX_PAGE_SIZE = 200
+ORDERS_SCAN_CHUNK = 100  # Rows read per query when a status filter is applied
+ORDERS_MAX_SCAN_CHUNKS = 20
+
+# Read-through cache for Firebase subtrees (seconds per path prefix, longest prefix wins)
+CACHE_MAX_ENTRIES = 256
+CACHE_DEFAULT_TTL = 30
+CACHE_TTLS = {
+    'Data/Categories': 300,
+    'Data/CategoriesItems': 120,
+    'Data/Coupons': 120,
+    'Data/LikedItems': 60,
+    'Data/OrderBills': 15,
+    'Data/Reviews': 60,
+    'Data/SoldItems': 60,
+    'Data/Users': 60,
+}
+
+# Worker threads used to fetch independent Firebase paths concurrently
+FETCH_WORKERS = 8
+
+# Sales aggregates are refreshed from Data/SoldItems at most this often (seconds)
+SALES_REFRESH_INTERVAL = 60
+
+# Uploaded images get resized WebP variants (widths in pixels) built in the background
+IMAGE_VARIANT_DIR = 'variants'
+IMAGE_VARIANT_WIDTHS = (160, 480)
+IMAGE_CARD_WIDTH = 480   # Catalogue cards
+IMAGE_THUMB_WIDTH = 160  # Previews and line-item thumbnails
+IMAGE_WEBP_QUALITY = 80
+IMAGE_WORKERS = 2
+# Per-worker image index: missing names are re-checked on disk after IMAGE_MISS_TTL seconds,
+# and the folder is rescanned every IMAGE_RESCAN_INTERVAL seconds for images replaced by other workers
+IMAGE_MISS_TTL = 30
+IMAGE_RESCAN_INTERVAL = 60
+
+# Static files: fingerprinted URLs are cached for a year; text assets are precompressed
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_COMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+STATIC_COMPRESS_MIN_SIZE = 256  # bytes
+# url_for() takes fingerprints from memory and re-checks a file on disk at most this often (seconds)
+STATIC_RECHECK_INTERVAL = 60
+
+# Rendered HTML of heavy pages is reused until the data under them changes, or the TTL passes
+PAGE_CACHE_MAX_ENTRIES = 64
+PAGE_CACHE_TTL = 60          # seconds; writes made by the mobile app are not seen without the mirror
+PAGE_CACHE_MIRROR_TTL = 600  # seconds, when the live mirror reports every change
+
+# Review statistics are rebuilt from Firebase this often (seconds); item details are paged by timestamp
+REVIEW_STATS_REBUILD_INTERVAL = 600
+REVIEW_SNIPPET_LENGTH = 100
+REVIEWS_PAGE_SIZE = 20
+REVIEWS_MAX_PAGE_SIZE = 100
+
+# Coupon index: full reload interval, scheduler period (seconds) and the "expiring soon" window (days)
+COUPON_INDEX_REBUILD_INTERVAL = 300
+COUPON_SWEEP_INTERVAL = 600
+COUPON_EXPIRING_DAYS = 7
+COUPON_VIEWS = ['active', 'expiring', 'upcoming', 'expired']
+
+# Likes leaderboard: full reload interval (seconds) and list sizes
+LIKES_REBUILD_INTERVAL = 600
+LIKES_TOP_K = 20
+LIKES_MAX_TOP_K = 100
+
+# Dashboard KPIs: items with fewer units in stock count as low inventory
+LOW_INVENTORY_THRESHOLD = 10
+
+# Users listed per page; the full id list comes from a shallow read
+USERS_PAGE_SIZE = 30
+
+# Largest number of paths written in one multi-location update
+BATCH_MAX_PATHS = 500
+
+# Bulk item import: manifest rows validated and committed together, and image writer threads
+IMPORT_BATCH_SIZE = 500
+IMPORT_IMAGE_WORKERS = 8
+
+# Search index is rebuilt from Firebase this often (seconds) to pick up writes made outside the admin
+SEARCH_REBUILD_INTERVAL = 600
+SEARCH_MAX_RESULTS = 100
+
+# Exports read Firebase in chunks of this many records
+EXPORT_CHUNK_SIZE = 500
+
+# JSON API paging
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# Nodes kept in memory when the live mirror is enabled (FIREBASE_MIRROR=1)
+MIRROR_PATHS = [
+    'Data/Categories',
+    'Data/CategoriesItems',
+    'Data/OrderBills',
+    'Data/Users',
+    'Data/Coupons',
+    'Data/SoldItems',
+    'Data/Reviews',
+    'Data/LikedItems',
+]
+
+#################################################################################################################################
+#                                         METRICS                                                                               #
+#################################################################################################################################
+
+
+class Metrics:
+    """Process-local counters and latency histograms rendered in Prometheus text format"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.counters = {}    # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self.help = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels=(), value=1):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name, labels, seconds):
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            buckets = series.get(labels)
+            if buckets is None:
+                buckets = series[labels] = [0] * len(self.BUCKETS) + [0.0, 0]
+            for index, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            buckets[-2] += seconds
+            buckets[-1] += 1
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self, gauges=()):
+        """Render every metric; gauges is an iterable of (name, labels, value)"""
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# HELP {name} {self.help.get(name, name)}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(series.items()):
+                    lines.append(f'{name}{self.format_labels(labels)} {value}')
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f'# HELP {name} {self.help.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, buckets in sorted(series.items()):
+                    for bound, count in zip(self.BUCKETS, buckets):
+                        lines.append(f'{name}_bucket{self.format_labels(labels, [("le", bound)])} {count}')
+                    lines.append(f'{name}_bucket{self.format_labels(labels, [("le", "+Inf")])} {buckets[-1]}')
+                    lines.append(f'{name}_sum{self.format_labels(labels)} {buckets[-2]:.6f}')
+                    lines.append(f'{name}_count{self.format_labels(labels)} {buckets[-1]}')
+        for name, labels, value in gauges:
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{self.format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.describe('agradmin_request_duration_seconds', 'Request latency by endpoint')
+metrics.describe('agradmin_template_render_seconds', 'Jinja render time by template')
+metrics.describe('agradmin_firebase_calls_total', 'Realtime Database calls by operation, path and outcome')
+metrics.describe('agradmin_firebase_seconds_total', 'Time spent in Realtime Database calls')
+metrics.describe('agradmin_firebase_call_seconds', 'Realtime Database call latency by operation and outcome')
+metrics.describe('agradmin_firebase_bytes_received_total',
+                 'Response bytes received from the Realtime Database (Content-Length, compressed)')
+metrics.describe('agradmin_image_lookups_total', 'Image path resolutions')
+metrics.describe('agradmin_firebase_retries_total', 'Realtime Database HTTP retries by method and cause')
+
+# Per-request totals ({'firebase_seconds', 'firebase_calls', 'render_seconds'}); copied into fetch pool threads
+request_stats = ContextVar('request_stats', default=None)
+
+
+def metric_path(path):
+    """Collapse a database path to its top two segments to keep label cardinality bounded"""
+    return '/'.join(path.strip('/').split('/')[:2]) or '/'
+
+
+def firebase_call(operation, path, call):
+    """Run a Realtime Database call and record its count and duration, failed calls included.
+
+    Payload sizes are counted by the HTTP transport from Content-Length (FirebaseTransport).
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        result = call()
+        outcome = 'ok'
+        return result
+    finally:
+        elapsed = time.perf_counter() - started
+        labels = (('op', operation), ('path', metric_path(path)))
+        metrics.inc('agradmin_firebase_calls_total', labels + (('outcome', outcome),))
+        metrics.inc('agradmin_firebase_seconds_total', labels, elapsed)
+        metrics.observe('agradmin_firebase_call_seconds', (('op', operation), ('outcome', outcome)), elapsed)
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats['firebase_seconds'] += elapsed
+            stats['firebase_calls'] += 1
+
+
+@app.before_request
+def start_request_timer():
+    request.started_at = time.perf_counter()
+    request_stats.set({'firebase_seconds': 0.0, 'firebase_calls': 0, 'render_seconds': 0.0})
+
+
+@app.after_request
+def record_request_timing(response):
+    started = getattr(request, 'started_at', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unknown'
+    metrics.observe('agradmin_request_duration_seconds',
+                    (('endpoint', endpoint), ('method', request.method), ('status', response.status_code)),
+                    elapsed)
+
+    stats = request_stats.get() or {}
+    if elapsed >= app.config['SLOW_REQUEST_SECONDS']:
+        app.logger.warning(
+            'Slow request %s %s took %.3fs (firebase %.3fs in %d calls, render %.3fs)',
+            request.method, request.full_path.rstrip('?'), elapsed,
+            stats.get('firebase_seconds', 0.0), stats.get('firebase_calls', 0), stats.get('render_seconds', 0.0))
+    return response
+
+
+@before_render_template.connect_via(app)
+def start_render_timer(sender, template, context, **extra):
+    context['_render_started_at'] = time.perf_counter()
+
+
+@template_rendered.connect_via(app)
+def record_render_timing(sender, template, context, **extra):
+    started = context.get('_render_started_at')
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    metrics.observe('agradmin_template_render_seconds', (('template', template.name),), elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats['render_seconds'] += elapsed
+
+
+#################################################################################################################################
+#                                         FIREBASE DATA ACCESS                                                                  #
+#################################################################################################################################
+
+
+class FirebaseRetry(Retry):
+    """urllib3 retry policy that counts every retry it grants"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        cause = f'status_{response.status}' if response is not None else type(error).__name__ if error else 'unknown'
+        metrics.inc('agradmin_firebase_retries_total', (('method', method or ''), ('cause', cause)))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class FirebaseTransport(HTTPAdapter):
+    """Bounded keep-alive connection pool for the SDK's REST session, with in-flight and pool statistics"""
+
+    def __init__(self, pool_size, retries, backoff):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.pool_size = pool_size
+        super().__init__(
+            pool_connections=4, pool_maxsize=pool_size,
+            # Callers wait for a free connection instead of opening throwaway ones beyond the bound
+            pool_block=True,
+            max_retries=FirebaseRetry(
+                total=retries, connect=retries, read=retries, status=retries,
+                backoff_factor=backoff,
+                status_forcelist=(429, 500, 502, 503, 504),
+                # RTDB reads and set/update/delete are idempotent; POST (push) is never replayed
+                allowed_methods=frozenset({'GET', 'PUT', 'PATCH', 'DELETE'}),
+                respect_retry_after_header=True,
+                # Hand the last error response back so the SDK raises its usual exception
+                raise_on_status=False,
+            ))
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = super().send(request, **kwargs)
+            # The header is the size on the wire; the body is not read here (it may be streamed)
+            size = response.headers.get('Content-Length')
+            if size and size.isdigit():
+                path = urlsplit(request.url).path
+                path = path[:-len('.json')] if path.endswith('.json') else path
+                metrics.inc('agradmin_firebase_bytes_received_total', (('path', metric_path(path)),), int(size))
+            return response
+        except Exception:
+            with self.lock:
+                self.failures += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        """Snapshot of request counters and, per host, connections opened and idle in the pool"""
+        pools = []
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            pools.append({
+                'host': f'{pool.scheme}://{pool.host}:{pool.port}',
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle,
+            })
+        with self.lock:
+            return {
+                'pool_size': self.pool_size,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'requests': self.requests,
+                'failures': self.failures,
+                'pools': pools,
+            }
+
+
+firebase_transport = None  # FirebaseTransport mounted by configure_firebase_transport()
+
+
+def configure_firebase_transport(config):
+    """Replace the SDK's default adapter on the database REST session with the tuned pool"""
+    global firebase_transport
+    if not config['FIREBASE_TUNED_TRANSPORT']:
+        return None
+    # The SDK does not expose its session publicly; if a release moves it, say so instead of
+    # silently running on the default adapter
+    client = getattr(db.reference('/'), '_client', None)
+    session = getattr(client, 'session', None)
+    if not isinstance(session, requests.Session):
+        app.logger.warning('Firebase transport not configured: the Admin SDK database client has no '
+                           'requests session; using the SDK default adapter')
+        return None
+    firebase_transport = FirebaseTransport(
+        config['FIREBASE_POOL_SIZE'], config['FIREBASE_RETRIES'], config['FIREBASE_RETRY_BACKOFF'])
+    session.mount('https://', firebase_transport)
+    session.mount('http://', firebase_transport)  # Database emulator
+    # Snapshots are JSON; ask for gzip explicitly rather than relying on the library default
+    session.headers['Accept-Encoding'] = 'gzip'
+    return firebase_transport
+
+
+class FirebaseCache:
+    """In-process read-through cache for Realtime Database paths with per-path TTLs and LRU eviction"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttls=None, default_ttl=CACHE_DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.entries = OrderedDict()  # path -> (expires_at, value)
+        # path -> [generation, loads in flight]; invalidate() bumps the generation of paths being loaded
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, path):
+        """Return the TTL of the longest configured prefix matching path"""
+        best, ttl = '', self.default_ttl
+        for prefix, prefix_ttl in self.ttls.items():
+            if (path == prefix or path.startswith(prefix + '/')) and len(prefix) > len(best):
+                best, ttl = prefix, prefix_ttl
+        return ttl
+
+    def get(self, path, loader):
+        """Return the cached value for path, calling loader() on a miss"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            self.misses += 1
+            state = self.loading.setdefault(path, [0, 0])
+            state[1] += 1
+            generation = state[0]
+
+        try:
+            value = loader()
+        finally:
+            with self.lock:
+                state = self.loading[path]
+                # A write invalidated the path while it loaded: the value may predate it
+                invalidated = state[0] != generation
+                state[1] -= 1
+                if not state[1]:
+                    del self.loading[path]
+        ttl = self.ttl_for(path)
+        if ttl > 0 and not invalidated:
+            with self.lock:
+                self.entries[path] = (time.monotonic() + ttl, value)
+                self.entries.move_to_end(path)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return copy.deepcopy(value)
+
+    def invalidate(self, path):
+        """Drop cached entries for path, its ancestors and its descendants"""
+        path = path.strip('/')
+        with self.lock:
+            stale = [key for key in self.entries
+                     if key == path or key.startswith(path + '/') or path.startswith(key + '/')]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+            for key, state in self.loading.items():
+                if key == path or key.startswith(path + '/') or path.startswith(key + '/'):
+                    state[0] += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            for state in self.loading.values():
+                state[0] += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class DatabaseMirror:
+    """In-memory copy of selected Realtime Database nodes kept current by streaming listeners.
+
+    Each root path is subscribed once with `listen()`; the first `put` event carries the
+    full snapshot and marks the root as ready, later `put`/`patch` events are applied
+    incrementally. Until a root is ready, reads for it fall back to the network.
+    """
+
+    def __init__(self, paths, listen=None):
+        self.paths = [path.strip('/') for path in paths]
+        self.listen = listen or (lambda path, callback: db.reference(path).listen(callback))
+        self.data = {}
+        self.ready_paths = set()
+        self.registrations = []
+        self.lock = threading.Lock()
+        self.events = 0
+
+    def start(self):
+        """Subscribe to every root path"""
+        for root in self.paths:
+            callback = self.make_callback(root)
+            self.registrations.append(self.listen(root, callback))
+
+    def stop(self):
+        for registration in self.registrations:
+            if registration is not None and hasattr(registration, 'close'):
+                registration.close()
+        self.registrations = []
+        with self.lock:
+            self.ready_paths.clear()
+
+    def make_callback(self, root):
+        def callback(event):
+            self.apply_event(root, event.event_type, event.path, event.data)
+        return callback
+
+    def apply_event(self, root, event_type, path, data):
+        """Apply a streaming `put` or `patch` event received for root"""
+        path = path.strip('/')
+        full_path = f'{root}/{path}' if path else root
+        with self.lock:
+            if event_type == 'put':
+                self.put(full_path, data)
+            elif event_type == 'patch':
+                for key, value in (data or {}).items():
+                    self.put(f'{full_path}/{key.strip("/")}', value)
+            else:
+                return
+            self.events += 1
+            if not path and event_type == 'put':
+                self.ready_paths.add(root)
+        # Let indexes and the page cache see changes made by other clients
+        notify_write(full_path, data, merge=event_type == 'patch')
+
+    def put(self, path, value):
+        """Replace the value at path (None deletes it). Caller holds the lock."""
+        parts = path.split('/')
+        node = self.data
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = copy.deepcopy(value)
+
+    def apply_write(self, path, value, merge=False):
+        """Mirror a local write right away so reads see it before the stream echoes it"""
+        path = path.strip('/')
+        if not self.covers(path):
+            return
+        with self.lock:
+            if merge:
+                for key, child in value.items():
+                    self.put(f'{path}/{key.strip("/")}', child)
+            else:
+                self.put(path, value)
+
+    def covers(self, path):
+        """True if path lives under a root whose initial snapshot has arrived"""
+        path = path.strip('/')
+        return any(path == root or path.startswith(root + '/') for root in self.ready_paths)
+
+    @property
+    def ready(self):
+        return len(self.ready_paths) == len(self.paths)
+
+    def get(self, path):
+        """Return a deep copy of the mirrored value at path"""
+        with self.lock:
+            return copy.deepcopy(self.lookup(path))
+
+    def lookup(self, path):
+        """Return the live mirrored value at path without copying. Caller must not mutate it."""
+        node = self.data
+        for part in path.strip('/').split('/'):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def status(self):
+        with self.lock:
+            return {
+                'enabled': True,
+                'ready': self.ready,
+                'ready_paths': sorted(self.ready_paths),
+                'pending_paths': [path for path in self.paths if path not in self.ready_paths],
+                'events': self.events,
+            }
+
+
+firebase_cache = FirebaseCache(ttls=CACHE_TTLS)
+database_mirror = None  # Created by start_background_tasks() when FIREBASE_MIRROR is enabled
+
+
+def db_get(path):
+    """Read a Realtime Database path from the live mirror, or through the shared cache"""
+    path = path.strip('/')
+    if database_mirror and database_mirror.covers(path):
+        return database_mirror.get(path)
+    return firebase_cache.get(path, lambda: firebase_call('get', path, db.reference(path).get))
+
+
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='firebase-fetch')
+
+
+def db_get_many(paths):
+    """Read several paths at once; network reads run concurrently on the fetch pool"""
+    paths = list(dict.fromkeys(path.strip('/') for path in paths))
+    results = {}
+    remote = []
+    for path in paths:
+        if database_mirror and database_mirror.covers(path):
+            results[path] = database_mirror.get(path)
+        else:
+            remote.append(path)
+    if len(remote) == 1:
+        results[remote[0]] = db_get(remote[0])
+    elif remote:
+        # Run each read in a copy of the request context so it is counted against this request
+        contexts = [copy_context() for _ in remote]
+        for path, value in zip(remote, fetch_executor.map(lambda ctx, path: ctx.run(db_get, path), contexts, remote)):
+            results[path] = value
+    return results
+
+
+def db_get_all(*paths):
+    """Read independent paths concurrently and return their values in order"""
+    results = db_get_many(paths)
+    return [results[path.strip('/')] for path in paths]
+
+
+def db_keys(path):
+    """List the child keys of a path without downloading the children (shallow read)"""
+    path = path.strip('/')
+    if database_mirror and database_mirror.covers(path):
+        with database_mirror.lock:
+            node = database_mirror.lookup(path)
+            return list(node.keys()) if isinstance(node, dict) else []
+    keys = firebase_call('shallow', path, lambda: db.reference(path).get(shallow=True))
+    return list(keys.keys()) if isinstance(keys, dict) else []
+
+
+def db_keys_many(paths):
+    """List the child keys of several paths concurrently"""
+    paths = list(dict.fromkeys(path.strip('/') for path in paths))
+    contexts = [copy_context() for _ in paths]
+    return dict(zip(paths, fetch_executor.map(lambda ctx, path: ctx.run(db_keys, path), contexts, paths)))
+
+
+def db_exists(path):
+    """True if a path holds a value; only its child keys move over the wire (shallow read)"""
+    path = path.strip('/')
+    if database_mirror and database_mirror.covers(path):
+        with database_mirror.lock:
+            return database_mirror.lookup(path) is not None
+    return firebase_call('shallow', path, lambda: db.reference(path).get(shallow=True)) is not None
+
+
+def db_get_key_range(path, first_key, last_key):
+    """Read the children of a path with keys from first_key to last_key in one ordered query"""
+    path = path.strip('/')
+    if database_mirror and database_mirror.covers(path):
+        with database_mirror.lock:
+            node = database_mirror.lookup(path) or {}
+            return {key: copy.deepcopy(value) for key, value in node.items() if first_key <= key <= last_key}
+    query = db.reference(path).order_by_key().start_at(first_key).end_at(last_key)
+    return firebase_call('query', path, query.get) or {}
+
+
+# Callables notified as listener(path, value, merge) after every successful write
+write_listeners = []
+
+
+def notify_write(path, value, merge=False):
+    """Tell in-memory indexes that a path was written"""
+    for listener in write_listeners:
+        try:
+            listener(path.strip('/'), value, merge)
+        except Exception as e:
+            print(f"Error in write listener for {path}: {e}")
+
+
+def db_set(path, value):
+    """Write a value to a path and invalidate the affected cache entries"""
+    firebase_call('set', path, lambda: db.reference(path).set(value))
+    firebase_cache.invalidate(path)
+    if database_mirror:
+        database_mirror.apply_write(path, value)
+    notify_write(path, value)
+
+
+def db_update(path, value):
+    """Update children of a path and invalidate the affected cache entries"""
+    firebase_call('update', path, lambda: db.reference(path).update(value))
+    firebase_cache.invalidate(path)
+    if database_mirror:
+        database_mirror.apply_write(path, value, merge=True)
+    notify_write(path, value, merge=True)
+
+
+def db_delete(path):
+    """Delete a path and invalidate the affected cache entries"""
+    firebase_call('delete', path, db.reference(path).delete)
+    firebase_cache.invalidate(path)
+    if database_mirror:
+        database_mirror.apply_write(path, None)
+    notify_write(path, None)
+
+
+def db_multi_update(updates):
+    """Apply {path: value} writes (None deletes) as atomic multi-location updates.
+
+    Paths are absolute database paths. Batches larger than BATCH_MAX_PATHS are split
+    into several updates, each of which is atomic on its own.
+    """
+    updates = {path.strip('/'): value for path, value in updates.items()}
+    items = list(updates.items())
+    for start in range(0, len(items), BATCH_MAX_PATHS):
+        chunk = dict(items[start:start + BATCH_MAX_PATHS])
+        firebase_call('update', metric_path(next(iter(chunk))), lambda: db.reference('/').update(chunk))
+        for path, value in chunk.items():
+            firebase_cache.invalidate(path)
+            if database_mirror:
+                database_mirror.apply_write(path, value)
+            notify_write(path, value)
+
+
+class WriteBatch:
+    """Collect set/update/delete operations and commit them in one multi-location update"""
+
+    def __init__(self):
+        self.updates = {}
+
+    def set(self, path, value):
+        self.updates[path.strip('/')] = value
+        return self
+
+    def update(self, path, values):
+        for key, value in values.items():
+            self.updates[f"{path.strip('/')}/{key.strip('/')}"] = value
+        return self
+
+    def delete(self, path):
+        self.updates[path.strip('/')] = None
+        return self
+
+    def __len__(self):
+        return len(self.updates)
+
+    def commit(self):
+        if self.updates:
+            db_multi_update(self.updates)
+        self.updates = {}
+
 
 #################################################################################################################################
 #                                         UTILITIES                                                                             #
 #################################################################################################################################
 
 
+class HostLock:
+    """Non-blocking lock shared by the worker processes on one host (flock on a file).
+
+    Background jobs that write to Firebase or log events take it, so one worker does the
+    work instead of all of them. The lock is released when its holder exits.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.handle = None
+        self.pid = None
+
+    def acquire(self):
+        """True if this process holds the lock, trying to take it if not"""
+        if self.handle is not None and self.pid == os.getpid():
+            return True
+        self.handle = None
+        if fcntl is None:  # No flock (Windows): servers there run a single process
+            self.handle, self.pid = True, os.getpid()
+            return True
+        url_hash = hashlib.sha1(app.config['FIREBASE_DATABASE_URL'].encode()).hexdigest()[:8]
+        path = os.path.join(app.config['LOCK_FOLDER'], f'agradmin-{self.name}-{url_hash}.lock')
+        handle = open(path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self.handle, self.pid = handle, os.getpid()
+        return True
+
+    def release(self):
+        if self.handle is not None and self.handle is not True and self.pid == os.getpid():
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+        self.handle = self.pid = None
+
+
 @app.template_global()
 def now():
     return datetime.now().strftime('%Y-%m-%d')
 
-def get_image_path(drawable_path):
+class ImageResolver:
+    """Index of the image folder with memoized drawable path -> URL lookups.
+
+    Each worker process has its own index. Uploads handled by another worker are found by a
+    file check on a miss (repeated at most every IMAGE_MISS_TTL seconds per name), and the
+    folder is rescanned every IMAGE_RESCAN_INTERVAL seconds to pick up replaced images.
+    """
+
+    VARIANT_NAME = re.compile(r'^(?P<base>.+)\.(?P<digest>[0-9a-f]{12})\.(?P<width>\d+)\.webp$')
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = set()
+        self.variants = {}  # image name -> (content hash, {width: variant file name})
+        self.urls = {}
+        self.misses = {}  # image name -> monotonic time until which it is known to be missing
+        self.scanned_at = None
+        self.scanning = False
+        self.lock = threading.Lock()
+
+    @property
+    def variant_folder(self):
+        return os.path.join(self.folder, IMAGE_VARIANT_DIR)
+
+    def scan(self):
+        """(Re)build the index of image files and their resized variants"""
+        try:
+            files = {name for name in os.listdir(self.folder)
+                     if os.path.isfile(os.path.join(self.folder, name))}
+        except FileNotFoundError:
+            files = set()
+        generations = {}  # image name -> {content hash: (newest mtime, {width: file name})}
+        try:
+            entries = list(os.scandir(self.variant_folder))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            match = self.VARIANT_NAME.match(entry.name)
+            if not match:
+                continue
+            mtime, widths = generations.setdefault(match['base'], {}).get(match['digest'], (0, {}))
+            widths[int(match['width'])] = entry.name
+            generations[match['base']][match['digest']] = (max(mtime, entry.stat().st_mtime), widths)
+        # Keep the newest generation when stale variants were left behind
+        variants = {}
+        for base, by_digest in generations.items():
+            digest = max(by_digest, key=lambda key: by_digest[key][0])
+            variants[base] = (digest, by_digest[digest][1])
+        with self.lock:
+            self.files = files
+            self.variants = variants
+            self.urls.clear()
+            self.misses.clear()
+            self.scanned_at = time.monotonic()
+
+    def rescan_if_stale(self):
+        """Rescan from one request thread when the index is older than IMAGE_RESCAN_INTERVAL"""
+        with self.lock:
+            if self.scanning or self.scanned_at is None or time.monotonic() - self.scanned_at < IMAGE_RESCAN_INTERVAL:
+                return
+            self.scanning = True
+        try:
+            self.scan()
+        finally:
+            with self.lock:
+                self.scanning = False
+
+    def exists_on_disk(self, image_name):
+        """Check for an image saved by another worker, at most once per IMAGE_MISS_TTL"""
+        now = time.monotonic()
+        if self.misses.get(image_name, 0) > now:
+            return False
+        if os.path.isfile(os.path.join(self.folder, f"{image_name}.png")):
+            with self.lock:
+                self.files.add(f"{image_name}.png")
+                self.misses.pop(image_name, None)
+            return True
+        with self.lock:
+            self.misses[image_name] = now + IMAGE_MISS_TTL
+        return False
+
+    def add(self, file_path):
+        """Register a file saved by an upload handler"""
+        filename = os.path.basename(file_path)
+        with self.lock:
+            self.files.add(filename)
+            # Forget memoized placeholders for this image
+            self.urls.pop(os.path.splitext(filename)[0], None)
+
+    def add_variants(self, image_name, digest, widths):
+        """Register the variants built for an image, replacing older ones"""
+        with self.lock:
+            self.variants[image_name] = (digest, dict(widths))
+            self.urls.pop(image_name, None)
+
+    def resolve(self, drawable_path, width=None):
+        """Convert Android drawable path to web-compatible image path.
+
+        With a width, the smallest variant at least that wide is preferred over the original.
+        """
+        # Remove 'drawable/' prefix if present
+        image_name = (drawable_path or '').replace('drawable/', '')
+        self.rescan_if_stale()
+        url = self.urls.get(image_name, {}).get(width)
+        if url is not None:
+            metrics.inc('agradmin_image_lookups_total', (('result', 'memoized'),))
+            return url
+        metrics.inc('agradmin_image_lookups_total', (('result', 'resolved'),))
+
+        variant = None
+        if width and image_name in self.variants:
+            widths = self.variants[image_name][1]
+            fitting = [size for size in widths if size >= width]
+            variant = widths[min(fitting) if fitting else max(widths)] if widths else None
+
+        if variant:
+            url = url_for('static', filename=f'images/{IMAGE_VARIANT_DIR}/{variant}')
+        elif image_name and (f"{image_name}.png" in self.files or self.exists_on_disk(image_name)):
+            url = url_for('static', filename=f'images/{image_name}.png')
+        else:
+            # If image doesn't exist, return a placeholder; not memoized, misses expire
+            return url_for('static', filename='images/placeholder.png')
+
+        with self.lock:
+            self.urls.setdefault(image_name, {})[width] = url
+        return url
+
+
+image_resolver = ImageResolver(app.config['UPLOAD_FOLDER'])
+
+
+def get_image_path(drawable_path, width=IMAGE_CARD_WIDTH):
     """Convert Android drawable path to web-compatible image path"""
-    if not drawable_path:
-        return url_for('static', filename='images/placeholder.png')
-    
-    # Remove 'drawable/' prefix if present
-    image_name = drawable_path.replace('drawable/', '')
-    
-    # Check if the image exists in static/images
-    image_path = os.path.join('static', 'images', f"{image_name}.png")
-    if os.path.exists(image_path):
-        return url_for('static', filename=f'images/{image_name}.png')
-    
-    # If image doesn't exist, return a placeholder
-    return url_for('static', filename='images/placeholder.png')
+    return image_resolver.resolve(drawable_path, width)
+
+
+class ImagePipeline:
+    """Decode uploads into real PNG files and build resized WebP variants off the request thread.
+
+    Variants are named <image>.<content hash>.<width>.webp, so a new upload under the same
+    image name always gets new URLs.
+    """
+
+    def __init__(self, resolver, widths=IMAGE_VARIANT_WIDTHS, workers=IMAGE_WORKERS):
+        self.resolver = resolver
+        self.widths = widths
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-pipeline')
+
+    def save_upload(self, source, base_name):
+        """Decode an uploaded file object, save it as <base_name>.png and queue its variants.
+
+        Raises ValueError when the file is not a PNG or JPEG image.
+        """
+        try:
+            with Image.open(source) as image:
+                if image.format not in ('PNG', 'JPEG'):
+                    raise ValueError('Invalid file type. Only PNG and JPEG allowed')
+                image.load()
+                # Phone photos are stored sideways with an EXIF orientation tag
+                image = ImageOps.exif_transpose(image)
+                if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+                    image = image.convert('RGB')
+                output = io.BytesIO()
+                image.save(output, 'PNG')
+        except (OSError, Image.DecompressionBombError):
+            raise ValueError('The uploaded file is not a valid PNG or JPEG image')
+
+        os.makedirs(self.resolver.folder, exist_ok=True)
+        file_path = os.path.join(self.resolver.folder, f"{base_name}.png")
+        # Write next to the target and rename, so pages never serve a half-written file
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(output.getvalue())
+        os.replace(temp_path, file_path)
+        self.resolver.add(file_path)
+        static_assets.invalidate(file_path)
+        self.executor.submit(self.build_variants, file_path)
+        return file_path
+
+    def build_variants(self, file_path, force=True):
+        """Write one WebP per configured width and drop variants of older uploads"""
+        try:
+            image_name = os.path.splitext(os.path.basename(file_path))[0]
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            if not force and self.resolver.variants.get(image_name, (None,))[0] == digest:
+                return False
+
+            folder = self.resolver.variant_folder
+            os.makedirs(folder, exist_ok=True)
+            widths = {}
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                transparent = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+                image = image.convert('RGBA' if transparent else 'RGB')
+                for width in self.widths:
+                    variant = image
+                    if image.width > width:
+                        # Never upscale; narrow originals are only re-encoded
+                        height = max(1, round(image.height * width / image.width))
+                        variant = image.resize((width, height), Image.LANCZOS)
+                    filename = f"{image_name}.{digest}.{width}.webp"
+                    variant.save(os.path.join(folder, filename), 'WEBP', quality=IMAGE_WEBP_QUALITY, method=4)
+                    widths[width] = filename
+            self.resolver.add_variants(image_name, digest, widths)
+
+            for name in os.listdir(folder):
+                match = ImageResolver.VARIANT_NAME.match(name)
+                if match and match['base'] == image_name and match['digest'] != digest:
+                    os.remove(os.path.join(folder, name))
+            return True
+        except Exception as e:
+            print(f"Error building image variants for {file_path}: {e}")
+            import traceback
+            print(f"Traceback: {traceback.format_exc()}")
+            return False
+
+    def build_all(self, force=False):
+        """Build variants for every image in the folder that does not have current ones"""
+        folder = self.resolver.folder
+        paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                 if name.lower().endswith('.png') and os.path.isfile(os.path.join(folder, name))]
+        return sum(self.executor.map(lambda path: self.build_variants(path, force), paths))
+
+
+image_pipeline = ImagePipeline(image_resolver)
+
+
+@app.cli.command('build-image-variants')
+@click.option('--force', is_flag=True, help='Rebuild variants that are already up to date.')
+def build_image_variants_command(force):
+    """Build resized WebP variants for every image in the upload folder."""
+    image_resolver.scan()
+    built = image_pipeline.build_all(force)
+    click.echo(f"Built variants for {built} images in {image_resolver.variant_folder}")
 
 
 @app.template_filter('datetime')
@@ -71,15 +1129,533 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+class StaticAssets:
+    """Manifest of static files: content hash per file plus gzip/brotli copies of text assets.
+
+    Built once at startup; an entry is recomputed when the file's mtime or size changes,
+    so uploads saved under an existing name get a new fingerprint. Serving a file checks
+    it every time; url_for() digests come from memory and re-check each file at most every
+    STATIC_RECHECK_INTERVAL seconds, or right after invalidate().
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.entries = {}  # relative path -> ((mtime_ns, size), content hash, {encoding: bytes})
+        self.checked = {}  # relative path -> monotonic time digest() last checked it on disk
+        self.lock = threading.Lock()
+
+    def build(self):
+        """Fingerprint every file under the static folder"""
+        entries = {}
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                entries[filename] = self.fingerprint(path)
+        now = time.monotonic()
+        with self.lock:
+            self.entries = entries
+            self.checked = dict.fromkeys(entries, now)
+        return len(entries)
+
+    def fingerprint(self, path):
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        encodings = {}
+        if os.path.splitext(path)[1].lower() in STATIC_COMPRESS_EXTENSIONS and len(data) >= STATIC_COMPRESS_MIN_SIZE:
+            encodings['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                encodings['br'] = brotli.compress(data, quality=11)
+        return (stat.st_mtime_ns, stat.st_size), hashlib.sha256(data).hexdigest()[:12], encodings
+
+    def lookup(self, filename):
+        """Current manifest entry for a static file, or None when it does not exist"""
+        path = safe_join(self.folder, filename)
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        if stat is None or not os.path.isfile(path):
+            with self.lock:
+                self.entries.pop(filename, None)
+            return None
+        entry = self.entries.get(filename)
+        if entry is None or entry[0] != (stat.st_mtime_ns, stat.st_size):
+            entry = self.fingerprint(path)
+            with self.lock:
+                self.entries[filename] = entry
+        return entry
+
+    def digest(self, filename):
+        """Content hash for url_for(); None when the file does not exist"""
+        now = time.monotonic()
+        checked = self.checked.get(filename)
+        if checked is not None and now - checked < STATIC_RECHECK_INTERVAL:
+            entry = self.entries.get(filename)
+        else:
+            entry = self.lookup(filename)
+            with self.lock:
+                self.checked[filename] = now
+        return entry[1] if entry else None
+
+    def invalidate(self, path):
+        """Make the next digest() re-check a file this process just wrote"""
+        filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+        with self.lock:
+            self.checked.pop(filename, None)
+
+
+static_assets = StaticAssets(app.static_folder)
+
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Append the content hash to static URLs so they can be cached forever"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        digest = static_assets.digest(values['filename'])
+        if digest:
+            values['v'] = digest
+
+
+def serve_static(filename):
+    """Serve a static file, precompressed when possible, with long-lived caching for fingerprinted URLs"""
+    entry = static_assets.lookup(filename)
+    encodings = entry[2] if entry else {}
+    encoding = next((name for name in ('br', 'gzip') if name in encodings and request.accept_encodings[name]), None)
+
+    if encoding:
+        response = Response(encodings[encoding],
+                            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{entry[1]}-{encoding}")
+        response.make_conditional(request)
+    else:
+        # Conditional GET against the content hash instead of mtime and size
+        response = send_from_directory(app.static_folder, filename, etag=entry[1] if entry else True)
+    if encodings:
+        response.vary.add('Accept-Encoding')
+
+    if entry and request.args.get('v') == entry[1]:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned URL: cache, but revalidate with the ETag every time
+        response.cache_control.no_cache = True
+    return response
+
+
+app.view_functions['static'] = serve_static
+
+
+class PageCache:
+    """Rendered HTML of heavy pages, keyed by request and by the version of the subtrees they read.
+
+    A root's version is bumped by every local write and live mirror event under it, so a
+    cached page is reused until its data changes or its TTL passes.
+    """
+
+    def __init__(self, max_entries=PAGE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.versions = {}  # root path -> version
+        self.pages = OrderedDict()  # key -> (versions, etag, html, expires_at)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def track(self, root):
+        with self.lock:
+            self.versions.setdefault(root.strip('/'), 0)
+
+    def version(self, roots):
+        with self.lock:
+            return tuple(self.versions.get(root.strip('/'), 0) for root in roots)
+
+    def on_write(self, path, value, merge):
+        """Write listener: bump every tracked root the written path overlaps"""
+        with self.lock:
+            for root in self.versions:
+                if path == root or path.startswith(root + '/') or root.startswith(path + '/'):
+                    self.versions[root] += 1
+
+    def get(self, key, versions):
+        with self.lock:
+            entry = self.pages.get(key)
+            if entry and entry[0] == versions and entry[3] > time.monotonic():
+                self.pages.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, versions, html, ttl):
+        # The ETag is a hash of the HTML, so it is stable across processes and restarts
+        entry = (versions, hashlib.sha256(html).hexdigest()[:16], html, time.monotonic() + ttl)
+        with self.lock:
+            self.pages[key] = entry
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.max_entries:
+                self.pages.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.pages)}
+
+
+page_cache = PageCache()
+write_listeners.append(page_cache.on_write)
+
+
+@before_render_template.connect_via(app)
+def skip_page_cache_on_error(sender, template, context, **extra):
+    """Pages rendered with an error message are never cached"""
+    if context.get('error'):
+        g.page_cacheable = False
+
+
+def cached_page(*roots):
+    """Serve a view's HTML from the page cache while the data under roots is unchanged.
+
+    Responses carry an ETag, so browsers revalidating an unchanged page get 304 Not Modified
+    without a Firebase read or a render.
+    """
+    for root in roots:
+        page_cache.track(root)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Flashed messages are shown once, so that render must not be reused
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            versions = page_cache.version(roots)
+            entry = page_cache.get(key, versions)
+            if entry is None:
+                g.page_cacheable = True
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or not g.page_cacheable:
+                    return response
+                mirrored = database_mirror and all(database_mirror.covers(root) for root in roots)
+                entry = page_cache.put(key, versions, response.get_data(),
+                                       PAGE_CACHE_MIRROR_TTL if mirrored else PAGE_CACHE_TTL)
+
+            response = Response(entry[2], mimetype='text/html')
+            response.set_etag(entry[1])
+            response.cache_control.no_cache = True  # Always revalidate; unchanged pages answer 304
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
 #################################################################################################################################
 #                                         DASHBOARD REQUEST MAPPING                                                             #
 #################################################################################################################################
 
 
+def order_day(order):
+    """Local date (YYYY-MM-DD) of an order's orderDate, or None"""
+    try:
+        return datetime.fromtimestamp(float(order.get('orderDate')) / 1000).strftime('%Y-%m-%d')
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class DashboardCounters:
+    """Materialized dashboard KPIs: orders per status, paid revenue per day and low stock items.
+
+    Each order's and item's contribution is remembered, so a write only re-reads the
+    orders or items it touched and adjusts the counters by the difference. When the
+    dashboard is viewed and the last full rebuild is older than DASHBOARD_RECONCILE_SECONDS,
+    a background thread rebuilds everything to correct drift; nothing is downloaded while
+    nobody looks at the dashboard.
+    """
+
+    def __init__(self, low_inventory=LOW_INVENTORY_THRESHOLD):
+        self.low_inventory = low_inventory
+        self.orders = {}  # order_id -> (status, day, totalPrice)
+        self.status_counts = {}
+        self.paid_by_day = {}  # YYYY-MM-DD -> revenue of PAID orders placed that day
+        self.inventory = {}  # category_id/item_id -> units in stock
+        self.low_items = set()
+        self.pending = set()  # ('order', id), ('category', id) or ('item', category_id, id); None reloads everything
+        self.building = False  # A rebuild is downloading; writes are still recorded as pending
+        self.built_at = None
+        self.reconciled_at = None
+        self.lock = threading.Lock()
+        self.reconcile_thread = None
+
+    def set_order(self, order_id, order):
+        """Replace one order's contribution. Caller holds the lock."""
+        old = self.orders.pop(order_id, None)
+        if old is not None:
+            status, day, total = old
+            self.status_counts[status] -= 1
+            if not self.status_counts[status]:
+                del self.status_counts[status]
+            if status == 'PAID' and day:
+                self.paid_by_day[day] -= total
+                if abs(self.paid_by_day[day]) < 0.005:
+                    del self.paid_by_day[day]
+        if not isinstance(order, dict):
+            return
+        status, day, total = order.get('status', 'UNKNOWN'), order_day(order), as_number(order.get('totalPrice'))
+        self.orders[order_id] = (status, day, total)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if status == 'PAID' and day:
+            self.paid_by_day[day] = self.paid_by_day.get(day, 0.0) + total
+
+    def set_item(self, product_id, item):
+        """Replace one item's stock level. Caller holds the lock."""
+        self.inventory.pop(product_id, None)
+        self.low_items.discard(product_id)
+        if not isinstance(item, dict):
+            return
+        units = as_number(item.get('Inventory'))
+        self.inventory[product_id] = units
+        if units < self.low_inventory:
+            self.low_items.add(product_id)
+
+    def set_category(self, category_id, items):
+        """Replace the stock levels of every item in one category. Caller holds the lock."""
+        for product_id in [product_id for product_id in self.inventory if product_id.startswith(category_id + '/')]:
+            self.set_item(product_id, None)
+        for item_id, item in (items if isinstance(items, dict) else {}).items():
+            self.set_item(f'{category_id}/{item_id}', item)
+
+    def snapshot(self):
+        """Totals compared before and after a rebuild to detect drift. Caller holds the lock."""
+        return {
+            'orders': dict(self.status_counts),
+            'paid_revenue': round(sum(self.paid_by_day.values()), 2),
+            'low_inventory': len(self.low_items),
+        }
+
+    def build(self):
+        # Writes made during the download stay pending and are re-read after it
+        with self.lock:
+            self.pending.clear()
+            self.building = True
+        try:
+            orders, categories_items = db_get_all('Data/OrderBills', 'Data/CategoriesItems')
+        finally:
+            with self.lock:
+                self.building = False
+        with self.lock:
+            previous = self.snapshot() if self.built_at is not None else None
+            self.orders = {}
+            self.status_counts = {}
+            self.paid_by_day = {}
+            self.inventory = {}
+            self.low_items = set()
+            for order_id, order in (orders or {}).items():
+                self.set_order(order_id, order)
+            for category_id, items in (categories_items or {}).items():
+                self.set_category(category_id, items)
+            self.built_at = time.monotonic()
+            self.reconciled_at = datetime.now()
+            current = self.snapshot()
+            if previous is not None and previous != current:
+                print(f"Dashboard counters drifted: {previous} -> {current}")
+
+    def on_write(self, path, value, merge):
+        """Write listener: remember which orders and items changed"""
+        parts = path.split('/')
+        with self.lock:
+            if self.built_at is None and not self.building:
+                return
+            if path in ('Data/OrderBills', 'Data/CategoriesItems') and merge and isinstance(value, dict):
+                if path == 'Data/OrderBills':
+                    self.pending.update(('order', key.split('/')[0]) for key in value)
+                else:
+                    self.pending.update(('category', key.split('/')[0]) for key in value)
+            elif not path or any(root.startswith(path + '/') or root == path
+                                 for root in ('Data/OrderBills', 'Data/CategoriesItems')):
+                self.pending.add(None)
+            elif parts[:2] == ['Data', 'OrderBills']:
+                self.pending.add(('order', parts[2]))
+            elif parts[:2] == ['Data', 'CategoriesItems'] and len(parts) == 3:
+                if merge and isinstance(value, dict):
+                    self.pending.update(('item', parts[2], key.split('/')[0]) for key in value)
+                else:
+                    self.pending.add(('category', parts[2]))
+            elif parts[:2] == ['Data', 'CategoriesItems']:
+                self.pending.add(('item', parts[2], parts[3]))
+
+    @staticmethod
+    def pending_path(entry):
+        if entry[0] == 'order':
+            return f'Data/OrderBills/{entry[1]}'
+        return 'Data/CategoriesItems/' + '/'.join(entry[1:])
+
+    def refresh(self):
+        """Build on first use, re-read pending orders and items, and start a reconcile when stale"""
+        if self.built_at is None or None in self.pending:
+            self.build()
+        elif time.monotonic() - self.built_at > app.config['DASHBOARD_RECONCILE_SECONDS']:
+            self.start_reconcile()
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            if None in pending:
+                # A whole-tree write landed while build() downloaded: reload everything next time
+                pending.discard(None)
+                self.pending.add(None)
+        if not pending:
+            return
+        fetched = db_get_many(self.pending_path(entry) for entry in pending)
+        with self.lock:
+            for entry in pending:
+                value = fetched.get(self.pending_path(entry))
+                if entry[0] == 'order':
+                    self.set_order(entry[1], value)
+                elif entry[0] == 'category':
+                    self.set_category(entry[1], value)
+                else:
+                    self.set_item(f'{entry[1]}/{entry[2]}', value)
+
+    def start_reconcile(self):
+        """Rebuild in a background thread unless one is already running; readers keep the current counters"""
+        with self.lock:
+            if self.reconcile_thread is not None and self.reconcile_thread.is_alive():
+                return
+            self.reconcile_thread = threading.Thread(target=self.reconcile, name='dashboard-reconcile', daemon=True)
+            self.reconcile_thread.start()
+
+    def reconcile(self):
+        try:
+            self.build()
+        except Exception as e:
+            print(f"Error reconciling dashboard counters: {e}")
+            import traceback
+            print(f"Traceback: {traceback.format_exc()}")
+
+    def summary(self, now=None):
+        """KPIs for the dashboard; revenue windows are today, this week (from Monday) and this month"""
+        self.refresh()
+        now = now or datetime.now()
+        week_days = now.weekday() + 1
+        month_days = now.day
+        # Look up at most one revenue bucket per day since the start of the week or month
+        days = [(now - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(max(week_days, month_days))]
+        with self.lock:
+            revenue = [self.paid_by_day.get(day, 0.0) for day in days]
+            return {
+                'orders': dict({status: self.status_counts.get(status, 0) for status in ORDER_STATUSES},
+                               **self.status_counts, total=len(self.orders)),
+                'revenue': {
+                    'today': round(revenue[0], 2),
+                    'week': round(sum(revenue[:week_days]), 2),
+                    'month': round(sum(revenue[:month_days]), 2),
+                },
+                'low_inventory': {'threshold': self.low_inventory, 'items': len(self.low_items)},
+                'reconciled_at': self.reconciled_at.isoformat(timespec='seconds') if self.reconciled_at else None,
+            }
+
+
+dashboard_counters = DashboardCounters()
+write_listeners.append(dashboard_counters.on_write)
+
+
+def dashboard_kpis():
+    """Dashboard counters plus the active coupon count from the coupon index"""
+    kpis = dashboard_counters.summary()
+    kpis['coupons'] = {'active': coupon_index.counts(datetime.now().strftime('%Y-%m-%d'))['active']}
+    return kpis
+
+
 @app.route('/')
 def dashboard():
-    """Render the main dashboard"""
-    return render_template('index.html')
+    """Render the main dashboard with KPIs from the materialized counters"""
+    try:
+        kpis = dashboard_kpis()
+    except Exception as e:
+        print(f"Error computing dashboard KPIs: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        kpis = None
+    return render_template('index.html', kpis=kpis)
+
+
+@app.route('/dashboard/kpis', methods=['GET'])
+def get_dashboard_kpis():
+    """Expose the dashboard KPIs as JSON"""
+    return jsonify(dashboard_kpis())
+
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Expose hit/miss counters of the Firebase read cache and the rendered page cache"""
+    return jsonify(dict(firebase_cache.stats(), pages=page_cache.stats()))
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expose request, template and Firebase metrics in Prometheus text format"""
+    cache_stats = firebase_cache.stats()
+    page_stats = page_cache.stats()
+    gauges = [
+        ('agradmin_cache_hits', (), cache_stats['hits']),
+        ('agradmin_cache_misses', (), cache_stats['misses']),
+        ('agradmin_cache_entries', (), cache_stats['entries']),
+        ('agradmin_page_cache_hits', (), page_stats['hits']),
+        ('agradmin_page_cache_misses', (), page_stats['misses']),
+        ('agradmin_page_cache_entries', (), page_stats['entries']),
+        ('agradmin_mirror_ready', (), int(bool(database_mirror and database_mirror.ready))),
+    ]
+    if firebase_transport is not None:
+        transport_stats = firebase_transport.stats()
+        gauges += [
+            ('agradmin_firebase_pool_size', (), transport_stats['pool_size']),
+            ('agradmin_firebase_in_flight', (), transport_stats['in_flight']),
+            ('agradmin_firebase_peak_in_flight', (), transport_stats['peak_in_flight']),
+            ('agradmin_firebase_transport_failures', (), transport_stats['failures']),
+        ]
+        for pool in transport_stats['pools']:
+            labels = (('host', pool['host']),)
+            gauges += [
+                ('agradmin_firebase_connections_opened', labels, pool['connections_opened']),
+                ('agradmin_firebase_connections_idle', labels, pool['idle']),
+            ]
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/transport/stats', methods=['GET'])
+def get_transport_stats():
+    """Report connection pool utilisation of the Firebase REST transport"""
+    if firebase_transport is None:
+        return jsonify({'configured': False})
+    return jsonify(dict(firebase_transport.stats(), configured=True))
+
+
+@app.route('/mirror/status', methods=['GET'])
+def get_mirror_status():
+    """Report whether the live database mirror has received its initial snapshots"""
+    if not database_mirror:
+        return jsonify({'enabled': False, 'ready': False})
+    return jsonify(database_mirror.status())
+
+
+@app.route('/cache/clear', methods=['POST'])
+def clear_cache():
+    """Drop every cached Firebase subtree"""
+    firebase_cache.clear()
+    page_cache.clear()
+    return jsonify(firebase_cache.stats())
 
 
 #################################################################################################################################
@@ -91,8 +1667,7 @@ def dashboard():
 def get_categories():
     """Get all categories from Firebase"""
     try:
-        categories_ref = db.reference('Data/Categories')
-        categories = categories_ref.get()
+        categories = db_get('Data/Categories')
         if not categories:
             return render_template('Categories/categories.html', error='No categories found')
         
@@ -112,24 +1687,18 @@ def get_categories():
 def get_categories_items(category_id):
     """Get all items in a specific category"""
     try:
-        # Get category details
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        # Get category details and its items concurrently
+        category, category_items = db_get_all(f'Data/Categories/{category_id}',
+                                              f'Data/CategoriesItems/{category_id}')
         
         if not category:
             return render_template('Categories/categories_items.html', error='Category not found')
-            
-        # Get items for this category
-        items_ref = db.reference('Data/CategoriesItems')
-        all_items = items_ref.get()
         
-        if not all_items or category_id not in all_items:
+        if not category_items:
             return render_template('Categories/categories_items.html', 
                                  category=category,
                                  error='No items found in this category')
         
-        category_items = all_items[category_id]
-        
         # Process images for items
         for item in category_items.values():
             if 'Image' in item:
@@ -165,8 +1734,7 @@ def add_category():
                                 error='All fields are required')
 
         # Check if category already exists
-        categories_ref = db.reference('Data/Categories')
-        if categories_ref.child(category_id).get():
+        if db_exists(f'Data/Categories/{category_id}'):
             return render_template('Categories/add_category.html', 
                                 error='Category ID already exists')
 
@@ -184,16 +1752,14 @@ def add_category():
             return render_template('Categories/add_category.html', 
                                 error='Invalid file type. Only PNG and JPEG allowed')
 
-        # Save the image
+        # Decode and save the image as a real PNG; resized variants are built in the background
         filename = secure_filename(file.filename)
         base_name = os.path.splitext(filename)[0]
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_name}.png")
-        
-        # Create directory if it doesn't exist
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Save and convert to PNG if necessary
-        file.save(file_path)
+        try:
+            image_pipeline.save_upload(file.stream, base_name)
+        except ValueError as e:
+            return render_template('Categories/add_category.html', 
+                                error=str(e))
 
         # Create new category in Firebase
         new_category = {
@@ -204,10 +1770,9 @@ def add_category():
         }
         
         # Initialize the category in Categories
-        categories_ref.child(category_id).set(new_category)
+        db_set(f'Data/Categories/{category_id}', new_category)
         
         # Initialize the category in CategoriesItems with a placeholder structure
-        categories_items_ref = db.reference('Data/CategoriesItems')
         placeholder_item = {
             'Id': f"{category_id}_placeholder",
             'Name': f"Placeholder for {category_name}",
@@ -219,7 +1784,7 @@ def add_category():
             'Type': category_id,
             'Quantity': 0
         }
-        categories_items_ref.child(category_id).child("placeholder").set(placeholder_item)
+        db_set(f'Data/CategoriesItems/{category_id}/placeholder', placeholder_item)
 
         return render_template('Categories/add_category.html', 
                             success='Category added successfully')
@@ -237,15 +1802,14 @@ def edit_category_form(category_id):
     """Display the form to edit an existing category"""
     try:
         # Get category details
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        category = db_get(f'Data/Categories/{category_id}')
         
         if not category:
             return render_template('Categories/add_category.html', 
                                 error='Category not found')
             
         # Convert image path to web URL
-        category['Image'] = get_image_path(category['Image'])
+        category['Image'] = get_image_path(category['Image'], IMAGE_THUMB_WIDTH)
             
         return render_template('Categories/add_category.html',
                              category=category)
@@ -270,8 +1834,7 @@ def update_category(category_id):
                                 error='All fields are required')
 
         # Get current category data
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        current_category = category_ref.get()
+        current_category = db_get(f'Data/Categories/{category_id}')
         
         if not current_category:
             return render_template('Categories/add_category.html', 
@@ -287,16 +1850,15 @@ def update_category(category_id):
                                     error='Invalid file type. Only PNG and JPEG allowed',
                                     category=current_category)
 
-            # Save the image
+            # Decode and save the image as a real PNG; resized variants are built in the background
             filename = secure_filename(file.filename)
             base_name = os.path.splitext(filename)[0]
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_name}.png")
-            
-            # Create directory if it doesn't exist
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            # Save and convert to PNG if necessary
-            file.save(file_path)
+            try:
+                image_pipeline.save_upload(file.stream, base_name)
+            except ValueError as e:
+                return render_template('Categories/add_category.html',
+                                    error=str(e),
+                                    category=current_category)
             image_path = f"drawable/{base_name}"
 
         # Update category in Firebase
@@ -307,10 +1869,10 @@ def update_category(category_id):
             'Image': image_path
         }
         
-        category_ref.set(updated_category)
+        db_set(f'Data/Categories/{category_id}', updated_category)
         
         # Convert image path to web URL for display
-        updated_category['Image'] = get_image_path(image_path)
+        updated_category['Image'] = get_image_path(image_path, IMAGE_THUMB_WIDTH)
         
         return render_template('Categories/add_category.html',
                             success='Category updated successfully',
@@ -329,24 +1891,22 @@ def update_category(category_id):
 def delete_category(category_id):
     """Delete a category and all its items"""
     try:
-        # Get category details first to check if it exists
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        # Get all categories first to check if it exists; the list is re-rendered afterwards
+        categories = db_get('Data/Categories') or {}
+        category = categories.pop(category_id, None)
         
         if not category:
             return render_template('Categories/categories.html',
                                 error='Category not found')
             
-        # Delete all items in this category
-        categories_items_ref = db.reference(f'Data/CategoriesItems/{category_id}')
-        categories_items_ref.delete()
-        
-        # Delete the category itself
-        category_ref.delete()
+        # Delete all items in this category and the category itself in one atomic update
+        WriteBatch() \
+            .delete(f'Data/CategoriesItems/{category_id}') \
+            .delete(f'Data/Categories/{category_id}') \
+            .commit()
         
-        # Get updated list of categories
-        all_categories_ref = db.reference('Data/Categories')
-        categories = all_categories_ref.get() or {}
+        for remaining in categories.values():
+            remaining['Image'] = get_image_path(remaining.get('Image'))
         
         return render_template('Categories/categories.html',
                              success=f'Category "{category["Name"]}" has been deleted successfully',
@@ -366,16 +1926,14 @@ def delete_category(category_id):
 
 
 @app.route('/all-items', methods=['GET'])
+@cached_page('Data/Categories', 'Data/CategoriesItems')
 def get_all_items():
     """Get all items from all categories"""
     try:
-        # Get all categories first
-        categories_ref = db.reference('Data/Categories')
-        categories = categories_ref.get() or {}
-        
-        # Get all items from all categories
-        categories_items_ref = db.reference('Data/CategoriesItems')
-        categories_items = categories_items_ref.get() or {}
+        # Get all categories and all items from all categories concurrently
+        categories, categories_items = db_get_all('Data/Categories', 'Data/CategoriesItems')
+        categories = categories or {}
+        categories_items = categories_items or {}
         
         # Process images for nested items
         for category_items in categories_items.values():
@@ -401,8 +1959,7 @@ def show_add_item_form(category_id):
     """Display the form to add a new item to a specific category"""
     try:
         # Get category details for display
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        category = db_get(f'Data/Categories/{category_id}')
         
         if not category:
             return render_template('Categories/add_item.html', 
@@ -453,23 +2010,18 @@ def add_item(category_id):
                                 error='Invalid file type. Only PNG and JPEG allowed',
                                 category_id=category_id)
 
-        # Save the image
+        # Decode and save the image as a real PNG; resized variants are built in the background
         filename = secure_filename(file.filename)
         base_name = os.path.splitext(filename)[0]
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_name}.png")
-        
-        # Create directory if it doesn't exist
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Save and convert to PNG if necessary
-        file.save(file_path)
+        try:
+            image_pipeline.save_upload(file.stream, base_name)
+        except ValueError as e:
+            return render_template('Categories/add_item.html',
+                                error=str(e),
+                                category_id=category_id)
 
-        # Reference to CategoriesItems/<category_id>
-        categories_items_ref = db.reference('Data/CategoriesItems')
-        category_items = categories_items_ref.child(category_id).get() or {}
-        
         # Check if item ID already exists in this category
-        if item_id in category_items:
+        if db_exists(f'Data/CategoriesItems/{category_id}/{item_id}'):
             return render_template('Categories/add_item.html',
                                 error='Item ID already exists in this category',
                                 category_id=category_id)
@@ -488,11 +2040,10 @@ def add_item(category_id):
         }
         
         # Add the item to the correct category in CategoriesItems
-        categories_items_ref.child(category_id).child(item_id).set(new_item)
+        db_set(f'Data/CategoriesItems/{category_id}/{item_id}', new_item)
 
         # Get category name for display
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        category = db_get(f'Data/Categories/{category_id}')
         
         return render_template('Categories/add_item.html',
                             success='Item added successfully',
@@ -512,17 +2063,13 @@ def add_item(category_id):
 def edit_item_form(category_id, item_id):
     """Display the form to edit an existing item"""
     try:
-        # Get category details
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        # Get category and item details concurrently
+        category, item = db_get_all(f'Data/Categories/{category_id}',
+                                    f'Data/CategoriesItems/{category_id}/{item_id}')
         
         if not category:
             return render_template('Categories/add_item.html', 
                                 error='Category not found')
-            
-        # Get item details
-        item_ref = db.reference(f'Data/CategoriesItems/{category_id}/{item_id}')
-        item = item_ref.get()
         
         if not item:
             return render_template('Categories/add_item.html',
@@ -531,7 +2078,7 @@ def edit_item_form(category_id, item_id):
                                 category_name=category['Name'])
             
         # Convert image path to web URL
-        item['Image'] = get_image_path(item['Image'])
+        item['Image'] = get_image_path(item['Image'], IMAGE_THUMB_WIDTH)
             
         return render_template('Categories/add_item.html',
                              category_id=category_id,
@@ -561,9 +2108,9 @@ def update_item(category_id, item_id):
                                 error='All fields are required',
                                 category_id=category_id)
 
-        # Get current item data
-        item_ref = db.reference(f'Data/CategoriesItems/{category_id}/{item_id}')
-        current_item = item_ref.get()
+        # Get current item data, and the category name for display, concurrently
+        current_item, category = db_get_all(f'Data/CategoriesItems/{category_id}/{item_id}',
+                                            f'Data/Categories/{category_id}')
         
         if not current_item:
             return render_template('Categories/add_item.html',
@@ -581,16 +2128,16 @@ def update_item(category_id, item_id):
                                     category_id=category_id,
                                     item=current_item)
 
-            # Save the image
+            # Decode and save the image as a real PNG; resized variants are built in the background
             filename = secure_filename(file.filename)
             base_name = os.path.splitext(filename)[0]
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{base_name}.png")
-            
-            # Create directory if it doesn't exist
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            # Save and convert to PNG if necessary
-            file.save(file_path)
+            try:
+                image_pipeline.save_upload(file.stream, base_name)
+            except ValueError as e:
+                return render_template('Categories/add_item.html',
+                                    error=str(e),
+                                    category_id=category_id,
+                                    item=current_item)
             image_path = f"drawable/{base_name}"
 
         # Update item in Firebase
@@ -606,14 +2153,10 @@ def update_item(category_id, item_id):
             'Quantity': current_item.get('Quantity', 0)  # Keep existing quantity or default to 0
         }
         
-        item_ref.set(updated_item)
-        
-        # Get category name for display
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        db_set(f'Data/CategoriesItems/{category_id}/{item_id}', updated_item)
         
         # Convert image path to web URL for display
-        updated_item['Image'] = get_image_path(image_path)
+        updated_item['Image'] = get_image_path(image_path, IMAGE_THUMB_WIDTH)
         
         return render_template('Categories/add_item.html',
                             success='Item updated successfully',
@@ -635,23 +2178,19 @@ def delete_item(category_id, item_id):
     """Delete an item from a category"""
     try:
         # Get item details first to check if it exists
-        item_ref = db.reference(f'Data/CategoriesItems/{category_id}/{item_id}')
-        item = item_ref.get()
+        item = db_get(f'Data/CategoriesItems/{category_id}/{item_id}')
         
         if not item:
             return render_template('Categories/categories_items.html',
                                 error='Item not found')
             
         # Delete the item
-        item_ref.delete()
+        db_delete(f'Data/CategoriesItems/{category_id}/{item_id}')
         
-        # Get updated list of items
-        items_ref = db.reference(f'Data/CategoriesItems/{category_id}')
-        items = items_ref.get() or {}
-        
-        # Get category details
-        category_ref = db.reference(f'Data/Categories/{category_id}')
-        category = category_ref.get()
+        # Get updated list of items and category details concurrently
+        items, category = db_get_all(f'Data/CategoriesItems/{category_id}',
+                                     f'Data/Categories/{category_id}')
+        items = items or {}
         
         return render_template('Categories/categories_items.html',
                              success=f'Item "{item["Name"]}" has been deleted successfully',
@@ -666,32 +2205,568 @@ def delete_item(category_id, item_id):
                              error=f'Error deleting item: {str(e)}')
 
         
+@app.route('/items/bulk', methods=['POST'])
+def bulk_update_items():
+    """Set Price and/or Inventory for many items in one round trip.
+
+    JSON body: {"items": [{"id": "<category_id>/<item_id>", "Price": 1.5, "Inventory": 10}, ...]}
+    """
+    try:
+        body = request.get_json(silent=True)
+        changes = body.get('items') if isinstance(body, dict) else None
+        if not changes:
+            return jsonify({'error': 'No items provided'}), 400
+        if not isinstance(changes, list):
+            return jsonify({'error': 'items must be a list of rows'}), 400
+
+        # Validate every row before writing anything
+        updates = {}
+        errors = []
+        for number, row in enumerate(changes, start=1):
+            if not isinstance(row, dict):
+                errors.append({'row': number, 'error': 'Each row must be an object'})
+                continue
+            product_id = str(row.get('id', ''))
+            if product_id.count('/') != 1:
+                errors.append({'row': number, 'id': product_id, 'error': 'id must be <category_id>/<item_id>'})
+                continue
+            try:
+                fields = {}
+                if row.get('Price') is not None:
+                    fields['Price'] = float(row['Price'])
+                    if fields['Price'] < 0:
+                        raise ValueError('Price cannot be negative')
+                if row.get('Inventory') is not None:
+                    fields['Inventory'] = int(row['Inventory'])
+                    if fields['Inventory'] < 0:
+                        raise ValueError('Inventory cannot be negative')
+                if not fields:
+                    raise ValueError('Nothing to update')
+            except (TypeError, ValueError) as e:
+                errors.append({'row': number, 'id': product_id, 'error': str(e)})
+                continue
+            updates[product_id] = fields
+        if errors:
+            return jsonify({'error': 'Invalid rows, nothing was written', 'rows': errors}), 400
+
+        # Only update items that exist, so a typo cannot create a partial item
+        existing = db_get_many(f'Data/CategoriesItems/{product_id}' for product_id in updates)
+        missing = [product_id for product_id in updates if not existing.get(f'Data/CategoriesItems/{product_id}')]
+        if missing:
+            return jsonify({'error': 'Items not found, nothing was written', 'missing': missing}), 404
+
+        batch = WriteBatch()
+        for product_id, fields in updates.items():
+            batch.update(f'Data/CategoriesItems/{product_id}', fields)
+        batch.commit()
+        return jsonify({'updated': len(updates)})
+
+    except Exception as e:
+        print(f"Error in bulk item update: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+
+# Manifest columns, named like the add item form fields; image is a file in the zip or the image folder
+IMPORT_COLUMNS = ['categoryId', 'itemId', 'itemName', 'description', 'price', 'unit', 'inventory', 'image']
+
+
+def read_import_manifest(stream, filename):
+    """Yield manifest rows from a binary CSV, JSON array or NDJSON stream"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if extension == 'csv':
+        yield from csv.DictReader(text)
+    elif extension in ('ndjson', 'jsonl'):
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None  # Reported against its row number
+    elif extension == 'json':
+        rows = json.load(text)
+        yield from (rows.get('items') or [] if isinstance(rows, dict) else rows)
+    else:
+        raise ValueError('Manifest must be a .csv, .json or .ndjson file')
+
+
+def parse_import_row(row):
+    """Validate one manifest row and build its item; raises ValueError with the reason"""
+    if not isinstance(row, dict):
+        raise ValueError('Row is not a valid JSON object')
+    values = {column: str(row.get(column) if row.get(column) is not None else '').strip()
+              for column in IMPORT_COLUMNS}
+    missing = [column for column in IMPORT_COLUMNS if not values[column]]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+    for column in ('categoryId', 'itemId'):
+        if re.search(r'[.$#\[\]/]', values[column]):
+            raise ValueError(f'{column} cannot contain . $ # [ ] or /')
+    try:
+        price = float(values['price'])
+    except ValueError:
+        raise ValueError('price must be a number')
+    try:
+        inventory = int(values['inventory'])
+    except ValueError:
+        raise ValueError('inventory must be a whole number')
+    if price < 0 or inventory < 0:
+        raise ValueError('price and inventory cannot be negative')
+    if not allowed_file(values['image']):
+        raise ValueError('Invalid image type. Only PNG and JPEG allowed')
+    base_name = os.path.splitext(secure_filename(os.path.basename(values['image'])))[0]
+    if not base_name:
+        raise ValueError('Invalid image file name')
+
+    return {
+        'Id': values['itemId'],
+        'Name': values['itemName'],
+        'Description': values['description'],
+        'Price': price,
+        'Unit': values['unit'],
+        'Inventory': inventory,
+        'Image': f"drawable/{base_name}",
+        'Type': values['categoryId'],
+        'Quantity': 0  # Initial quantity in cart
+    }
+
+
+class ItemImport:
+    """One bulk import run.
+
+    Rows are validated in batches against a single snapshot of the catalogue, images are
+    extracted on a worker pool, and each batch is committed as a multi-location update.
+    """
+
+    def __init__(self, images=None, dry_run=False):
+        self.images = images  # Open zipfile.ZipFile, or None when every image is already uploaded
+        self.members = {}
+        if images is not None:
+            for info in images.infolist():
+                if not info.is_dir():
+                    self.members.setdefault(os.path.basename(info.filename), info)
+        self.dry_run = dry_run
+        self.saved = {}  # base name -> future, so an image shared by several rows is written once
+
+        # Only keys are needed: one shallow read per category instead of the whole catalogue
+        self.categories = set(db_keys('Data/Categories'))
+        catalogue = db_keys_many(f'Data/CategoriesItems/{category_id}' for category_id in self.categories)
+        self.existing = {(path.rsplit('/', 1)[1], item_id) for path, item_ids in catalogue.items() for item_id in item_ids}
+        self.report = {'rows': 0, 'valid': 0, 'imported': 0, 'images': 0, 'errors': [], 'dry_run': dry_run}
+
+    def run(self, rows):
+        """Import an iterable of manifest rows and return the report"""
+        started = time.perf_counter()
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        with ThreadPoolExecutor(max_workers=IMPORT_IMAGE_WORKERS, thread_name_prefix='item-import') as pool:
+            batch = []
+            for number, row in enumerate(rows, start=1):
+                batch.append((number, row))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self.import_batch(batch, pool)
+                    batch = []
+            if batch:
+                self.import_batch(batch, pool)
+        self.report['seconds'] = round(time.perf_counter() - started, 3)
+        return self.report
+
+    def error(self, number, row, message):
+        item_id = row.get('itemId') if isinstance(row, dict) else None
+        self.report['errors'].append({'row': number, 'itemId': item_id, 'error': message})
+
+    def validate(self, number, row):
+        """Return (path, item, zip member or None) for a valid row, or None after recording the error"""
+        try:
+            item = parse_import_row(row)
+            category_id, item_id = item['Type'], item['Id']
+            if category_id not in self.categories:
+                raise ValueError(f'Category {category_id} does not exist')
+            if (category_id, item_id) in self.existing:
+                raise ValueError('Item ID already exists in this category')
+            member = self.members.get(os.path.basename(str(row['image']).strip()))
+            base_name = item['Image'].replace('drawable/', '')
+            if member is None and f"{base_name}.png" not in image_resolver.files:
+                raise ValueError(f"Image {row['image']} is not in the zip or the image folder")
+            if member is not None and member.file_size > app.config['MAX_CONTENT_LENGTH']:
+                raise ValueError(f"Image {row['image']} is larger than the upload limit")
+        except ValueError as e:
+            self.error(number, row, str(e))
+            return None
+        # Later rows with the same ID are reported as duplicates
+        self.existing.add((category_id, item_id))
+        return f'Data/CategoriesItems/{category_id}/{item_id}', item, member
+
+    def save_image(self, member, base_name):
+        """Extract one image from the zip and run it through the image pipeline"""
+        image_pipeline.save_upload(io.BytesIO(self.images.read(member)), base_name)
+
+    def import_batch(self, rows, pool):
+        accepted = []
+        for number, row in rows:
+            self.report['rows'] += 1
+            result = self.validate(number, row)
+            if result:
+                accepted.append((number, row) + result)
+        self.report['valid'] += len(accepted)
+        if self.dry_run or not accepted:
+            return
+
+        # Start every image write of the batch before waiting on any of them
+        for _, _, _, item, member in accepted:
+            base_name = item['Image'].replace('drawable/', '')
+            if member is not None and base_name not in self.saved:
+                self.saved[base_name] = pool.submit(self.save_image, member, base_name)
+
+        # Only commit items whose image is on disk
+        batch = WriteBatch()
+        committed = []
+        for number, row, path, item, member in accepted:
+            future = self.saved.get(item['Image'].replace('drawable/', '')) if member is not None else None
+            try:
+                if future is not None:
+                    future.result()
+            except Exception as e:
+                self.error(number, row, f'Could not save image: {e}')
+                continue
+            batch.set(path, item)
+            committed.append((number, row))
+        try:
+            batch.commit()
+        except Exception as e:
+            for number, row in committed:
+                self.error(number, row, f'Could not write item: {e}')
+            return
+        self.report['imported'] += len(committed)
+        self.report['images'] = sum(1 for future in self.saved.values()
+                                    if future.done() and future.exception() is None)
+
+
+def run_item_import(manifest_stream, manifest_name, images=None, dry_run=False):
+    """Import items from a manifest stream and an optional zip of images, returning the report"""
+    archive = zipfile.ZipFile(images) if images is not None else None
+    try:
+        return ItemImport(archive, dry_run).run(read_import_manifest(manifest_stream, manifest_name))
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+@app.route('/items/import', methods=['GET'])
+def show_import_items_form():
+    """Display the bulk item import form"""
+    return render_template('Items/import_items.html')
+
+
+@app.route('/items/import', methods=['POST'])
+def import_items():
+    """Import items from an uploaded manifest and zip of images"""
+    try:
+        # A catalogue upload is far larger than a single item image (per-request limits need Flask 3.1)
+        request.max_content_length = app.config['IMPORT_MAX_CONTENT_LENGTH']
+
+        manifest = request.files.get('manifest')
+        if not manifest or manifest.filename == '':
+            return render_template('Items/import_items.html', error='No manifest file selected')
+        images = request.files.get('images')
+        images = images.stream if images and images.filename else None
+        dry_run = request.form.get('dryRun') == 'on'
+
+        try:
+            report = run_item_import(manifest.stream, manifest.filename, images, dry_run)
+        except zipfile.BadZipFile:
+            return render_template('Items/import_items.html', error='Images must be uploaded as a zip archive')
+        except (ValueError, csv.Error) as e:
+            return render_template('Items/import_items.html', error=f'Could not read manifest: {e}')
+
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(report)
+        return render_template('Items/import_items.html', report=report)
+
+    except Exception as e:
+        print(f"Error importing items: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return render_template('Items/import_items.html', error=f'Error importing items: {str(e)}')
+
+
+@app.cli.command('import-items')
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--images', type=click.Path(exists=True, dir_okay=False),
+              help='Zip archive of the images named in the manifest.')
+@click.option('--dry-run', is_flag=True, help='Validate the manifest without writing anything.')
+def import_items_command(manifest, images, dry_run):
+    """Bulk import catalogue items from a CSV, JSON or NDJSON manifest."""
+    with open(manifest, 'rb') as stream:
+        report = run_item_import(stream, manifest, images, dry_run)
+    for error in report['errors']:
+        click.echo(f"Row {error['row']} ({error['itemId'] or '-'}): {error['error']}", err=True)
+    click.echo(f"{report['valid']} of {report['rows']} rows valid, {report['imported']} items and "
+               f"{report['images']} images imported in {report['seconds']}s")
+    if report['errors']:
+        raise SystemExit(1)
+
+
 #################################################################################################################################
 #                                         COUPONS REQUEST MAPPING                                                               #
 #################################################################################################################################
 
 
+class CouponIndex:
+    """Coupons kept in memory, sorted by startDate and endDate, with a productId lookup.
+
+    Dates are YYYY-MM-DD strings, so they sort and compare correctly as text. "Active on
+    a date" and "expiring before a date" are bisect range scans instead of a full pass.
+    Statuses are computed once per date and kept across reloads. Writes and live mirror
+    events re-read only the coupons they touched; the whole node is reloaded every
+    rebuild_interval.
+    """
+
+    def __init__(self, rebuild_interval=COUPON_INDEX_REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self.coupons = {}
+        self.by_start = []  # sorted (startDate, coupon_id)
+        self.by_end = []  # sorted (endDate, coupon_id)
+        self.by_product = {}  # productId -> set of coupon ids
+        self.statuses = {}  # coupon_id -> upcoming/active/expired on status_date
+        self.status_date = None
+        self.pending = set()  # coupon ids to re-read; None means reload everything
+        self.building = False  # A rebuild is downloading; writes are still recorded as pending
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def build(self):
+        # Writes made during the download stay pending and are re-read after it
+        with self.lock:
+            self.pending.clear()
+            self.building = True
+        try:
+            coupons = db_get('Data/Coupons') or {}
+        finally:
+            with self.lock:
+                self.building = False
+        with self.lock:
+            self.coupons = {}
+            self.by_start = []
+            self.by_end = []
+            self.by_product = {}
+            self.statuses = {}  # Refilled by insert() for the current status_date
+            for coupon_id, coupon in coupons.items():
+                if isinstance(coupon, dict):
+                    self.insert(coupon_id, coupon)
+            self.by_start.sort()
+            self.by_end.sort()
+            self.built_at = time.monotonic()
+
+    def insert(self, coupon_id, coupon, keep_sorted=False):
+        """Add a coupon to every index. Caller holds the lock."""
+        self.coupons[coupon_id] = coupon
+        add = bisect.insort if keep_sorted else list.append
+        add(self.by_start, (str(coupon.get('startDate', '')), coupon_id))
+        add(self.by_end, (str(coupon.get('endDate', '')), coupon_id))
+        self.by_product.setdefault(coupon.get('productId'), set()).add(coupon_id)
+        if self.status_date is not None:
+            self.statuses[coupon_id] = coupon_status(coupon, self.status_date)
+
+    def remove(self, coupon_id):
+        """Drop a coupon from every index. Caller holds the lock."""
+        coupon = self.coupons.pop(coupon_id, None)
+        if coupon is None:
+            return
+        for entries, key in ((self.by_start, 'startDate'), (self.by_end, 'endDate')):
+            position = bisect.bisect_left(entries, (str(coupon.get(key, '')), coupon_id))
+            if position < len(entries) and entries[position][1] == coupon_id:
+                del entries[position]
+        ids = self.by_product.get(coupon.get('productId'))
+        if ids:
+            ids.discard(coupon_id)
+            if not ids:
+                del self.by_product[coupon.get('productId')]
+        self.statuses.pop(coupon_id, None)
+
+    def on_write(self, path, value, merge):
+        """Write listener: remember which coupons changed"""
+        with self.lock:
+            if self.built_at is None and not self.building:
+                return
+            if not path or path == 'Data/Coupons' or 'Data/Coupons'.startswith(path + '/'):
+                self.pending.add(None)
+            elif path.startswith('Data/Coupons/'):
+                self.pending.add(path.split('/')[2])
+
+    def refresh(self):
+        """Build on first use, reload when stale, and re-read pending coupons"""
+        if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_interval or None in self.pending:
+            self.build()
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            if None in pending:
+                # The whole node was rewritten during build(): reload it on the next refresh
+                pending.discard(None)
+                self.pending.add(None)
+        if not pending:
+            return
+        fetched = db_get_many(f'Data/Coupons/{coupon_id}' for coupon_id in pending)
+        with self.lock:
+            for coupon_id in pending:
+                self.remove(coupon_id)
+                coupon = fetched.get(f'Data/Coupons/{coupon_id}')
+                if isinstance(coupon, dict):
+                    self.insert(coupon_id, coupon, keep_sorted=True)
+
+    def update_statuses(self, current_date):
+        """Compute every status for current_date, once per date"""
+        self.refresh()
+        with self.lock:
+            if self.status_date == current_date:
+                return
+            self.statuses = {coupon_id: coupon_status(coupon, current_date) for coupon_id, coupon in self.coupons.items()}
+            self.status_date = current_date
+
+    def status_snapshot(self, current_date):
+        """Copy of {coupon_id: status} on current_date"""
+        self.update_statuses(current_date)
+        with self.lock:
+            return dict(self.statuses)
+
+    def ids_ending_between(self, first, last):
+        """Coupon ids whose endDate is in [first, last], by endDate"""
+        low = bisect.bisect_left(self.by_end, (first,))
+        high = bisect.bisect_right(self.by_end, (last, '\uffff'))
+        return [coupon_id for _, coupon_id in self.by_end[low:high]]
+
+    def query(self, current_date, view=None, product_id=None):
+        """Return {coupon_id: coupon with status} for one view on current_date"""
+        self.update_statuses(current_date)
+        with self.lock:
+            if product_id:
+                ids = sorted(self.by_product.get(product_id, ()))
+            elif view == 'active':
+                # Coupons still running on the date that had already started
+                ids = [coupon_id for _, coupon_id in self.by_end[bisect.bisect_left(self.by_end, (current_date,)):]
+                       if self.statuses.get(coupon_id) == 'active']
+            elif view == 'expiring':
+                last = (datetime.strptime(current_date, '%Y-%m-%d')
+                        + timedelta(days=COUPON_EXPIRING_DAYS)).strftime('%Y-%m-%d')
+                ids = [coupon_id for coupon_id in self.ids_ending_between(current_date, last)
+                       if self.statuses.get(coupon_id) == 'active']
+            elif view == 'upcoming':
+                ids = [coupon_id for _, coupon_id in self.by_start[bisect.bisect_right(self.by_start, (current_date, '\uffff')):]]
+            elif view == 'expired':
+                ids = [coupon_id for _, coupon_id in self.by_end[:bisect.bisect_left(self.by_end, (current_date,))]]
+            else:
+                ids = list(self.coupons)
+            return {coupon_id: dict(self.coupons[coupon_id], status=self.statuses.get(coupon_id))
+                    for coupon_id in ids if coupon_id in self.coupons}
+
+    def expired_before(self, cutoff):
+        """Ids of coupons whose endDate is a valid date before cutoff.
+
+        Coupons with an empty or unparsable endDate sort first but never count as expired.
+        """
+        self.refresh()
+        with self.lock:
+            return [coupon_id for end_date, coupon_id in self.by_end[:bisect.bisect_left(self.by_end, (cutoff,))]
+                    if parse_coupon_date(end_date)]
+
+    def counts(self, current_date):
+        self.update_statuses(current_date)
+        with self.lock:
+            counts = {status: 0 for status in ('upcoming', 'active', 'expired')}
+            for status in self.statuses.values():
+                counts[status] += 1
+            return counts
+
+
+coupon_index = CouponIndex()
+write_listeners.append(coupon_index.on_write)
+
+
+class CouponScheduler:
+    """Background thread that logs coupons moving between statuses and, when
+    COUPON_PURGE_AFTER_DAYS is set, deletes long-expired coupons in one batched write.
+
+    Every worker runs the thread, but only the holder of the host-wide "coupon-scheduler"
+    lock sweeps; the others retry the lock each interval and take over if the holder exits.
+    Transitions are found by comparing with the statuses seen at the previous sweep, so
+    index reloads and page views never swallow them.
+    """
+
+    def __init__(self, index, interval=COUPON_SWEEP_INTERVAL):
+        self.index = index
+        self.interval = interval
+        self.leader = HostLock('coupon-scheduler')
+        self.last_statuses = None  # {coupon_id: status} at the previous sweep
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='coupon-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.leader.release()
+
+    def run(self):
+        while True:
+            try:
+                if self.leader.acquire():
+                    self.sweep()
+            except Exception as e:
+                print(f"Error in coupon sweep: {e}")
+                import traceback
+                print(f"Traceback: {traceback.format_exc()}")
+            if self.stop_event.wait(self.interval):
+                return
+
+    def sweep(self, current_date=None):
+        """Update statuses for today and purge expired coupons; returns the purged ids"""
+        current_date = current_date or datetime.now().strftime('%Y-%m-%d')
+        statuses = self.index.status_snapshot(current_date)
+        if self.last_statuses is not None:
+            for coupon_id, status in sorted(statuses.items()):
+                old_status = self.last_statuses.get(coupon_id)
+                if old_status is not None and old_status != status:
+                    print(f"Coupon {coupon_id}: {old_status} -> {status}")
+        self.last_statuses = statuses
+
+        purge_after = app.config['COUPON_PURGE_AFTER_DAYS']
+        if purge_after is None:
+            return []
+        cutoff = (datetime.strptime(current_date, '%Y-%m-%d') - timedelta(days=purge_after)).strftime('%Y-%m-%d')
+        expired = self.index.expired_before(cutoff)
+        if expired:
+            batch = WriteBatch()
+            for coupon_id in expired:
+                batch.delete(f'Data/Coupons/{coupon_id}')
+            batch.commit()
+            print(f"Purged {len(expired)} coupons that expired before {cutoff}")
+        return expired
+
+
+coupon_scheduler = CouponScheduler(coupon_index)
+
+
 @app.route('/coupons', methods=['GET'])
 def get_coupons():
-    """Get all coupons from Firebase"""
+    """Get coupons from the coupon index, optionally one view or one product"""
     try:
-        coupons_ref = db.reference('Data/Coupons')
-        coupons = coupons_ref.get()
+        view = request.args.get('view') if request.args.get('view') in COUPON_VIEWS else None
+        product_id = request.args.get('product') or None
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        coupons = coupon_index.query(current_date, view=view, product_id=product_id)
 
-        if not coupons:
+        if not coupons and not (view or product_id):
             return render_template('Coupons/coupons.html', error='No coupons found')
-            
-        # Process coupons to add status
-        current_date = datetime.now().strftime('%Y-%m-%d')
-        for coupon in coupons.values():
-            if coupon['startDate'] > current_date:
-                coupon['status'] = 'upcoming'
-            elif coupon['endDate'] < current_date:
-                coupon['status'] = 'expired'
-            else:
-                coupon['status'] = 'active'
-            
-        return render_template('Coupons/coupons.html', coupons=coupons)
+
+        return render_template('Coupons/coupons.html', coupons=coupons, view=view, product_id=product_id)
     except Exception as e:
         print(f"Error getting coupons: {e}")
         import traceback
@@ -739,16 +2814,18 @@ def add_coupon():
             return render_template('Coupons/add_coupon.html',
                                 error='End date must be after start date')
 
+        # Check the coupon ID and the product ID concurrently
+        category_id, item_id = product_id.split('/')
+        existing_coupon, product = db_get_all(f'Data/Coupons/{coupon_id}',
+                                              f'Data/CategoriesItems/{category_id}/{item_id}')
+
         # Check if coupon ID already exists
-        coupons_ref = db.reference('Data/Coupons')
-        if coupons_ref.child(coupon_id).get():
+        if existing_coupon:
             return render_template('Coupons/add_coupon.html',
                                 error='Coupon ID already exists')
 
         # Validate product ID exists
-        category_id, item_id = product_id.split('/')
-        categories_items_ref = db.reference(f'Data/CategoriesItems/{category_id}')
-        if not categories_items_ref.child(item_id).get():
+        if not product:
             return render_template('Coupons/add_coupon.html',
                                 error='Product ID does not exist')
 
@@ -763,7 +2840,7 @@ def add_coupon():
             'productId': product_id
         }
         
-        coupons_ref.child(coupon_id).set(new_coupon)
+        db_set(f'Data/Coupons/{coupon_id}', new_coupon)
 
         return render_template('Coupons/add_coupon.html',
                             success='Coupon added successfully')
@@ -781,8 +2858,7 @@ def edit_coupon_form(coupon_id):
     """Display the form to edit an existing coupon"""
     try:
         # Get coupon details
-        coupon_ref = db.reference(f'Data/Coupons/{coupon_id}')
-        coupon = coupon_ref.get()
+        coupon = db_get(f'Data/Coupons/{coupon_id}')
         
         if not coupon:
             return render_template('Coupons/add_coupon.html', 
@@ -841,8 +2917,7 @@ def update_coupon(coupon_id):
 
         # Validate product ID exists
         category_id, item_id = product_id.split('/')
-        item_ref = db.reference(f'Data/CategoriesItems/{category_id}/{item_id}')
-        if not item_ref.get():
+        if not db_get(f'Data/CategoriesItems/{category_id}/{item_id}'):
             return render_template('Coupons/add_coupon.html',
                                 error='Product ID does not exist')
 
@@ -857,8 +2932,7 @@ def update_coupon(coupon_id):
             'productId': product_id
         }
         
-        coupon_ref = db.reference(f'Data/Coupons/{coupon_id}')
-        coupon_ref.set(updated_coupon)
+        db_set(f'Data/Coupons/{coupon_id}', updated_coupon)
         
         return render_template('Coupons/add_coupon.html',
                              success='Coupon updated successfully',
@@ -877,8 +2951,7 @@ def delete_coupon(coupon_id):
     """Delete a coupon"""
     try:
         # Get coupon details first to check if it exists
-        coupon_ref = db.reference(f'Data/Coupons/{coupon_id}')
-        coupon = coupon_ref.get()
+        coupon = db_get(f'Data/Coupons/{coupon_id}')
         
         if not coupon:
             return render_template('Coupons/coupons.html',
@@ -889,18 +2962,15 @@ def delete_coupon(coupon_id):
         if current_date <= coupon['endDate']:
             return render_template('Coupons/coupons.html',
                                 error='Only expired coupons can be deleted',
-                                coupons=db.reference('Data/Coupons').get() or {})
+                                coupons=coupon_index.query(current_date))
             
         # Delete the coupon
-        coupon_ref.delete()
-        
-        # Get updated list of coupons
-        coupons_ref = db.reference('Data/Coupons')
-        coupons = coupons_ref.get() or {}
+        db_delete(f'Data/Coupons/{coupon_id}')
         
+        # The index re-reads only the deleted coupon
         return render_template('Coupons/coupons.html',
                              success=f'Coupon "{coupon["description"]}" has been deleted successfully',
-                             coupons=coupons)
+                             coupons=coupon_index.query(current_date))
 
     except Exception as e:
         print(f"Error deleting coupon: {e}")
@@ -908,7 +2978,7 @@ def delete_coupon(coupon_id):
         print(f"Traceback: {traceback.format_exc()}")
         return render_template('Coupons/coupons.html',
                              error=f'Error deleting coupon: {str(e)}',
-                             coupons=db.reference('Data/Coupons').get() or {})
+                             coupons=coupon_index.query(datetime.now().strftime('%Y-%m-%d')))
     
     
 #################################################################################################################################
@@ -916,12 +2986,141 @@ def delete_coupon(coupon_id):
 #################################################################################################################################
 
 
+class LikesLeaderboard:
+    """Like counts per product and per user, kept current from Data/LikedItems changes.
+
+    Each user's liked product ids are remembered, so re-reading one user only applies the
+    difference to the counts. Top lists come from a bounded heap and are cached until a
+    count changes.
+    """
+
+    def __init__(self, rebuild_interval=LIKES_REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self.user_likes = {}  # user_id -> set of product ids
+        self.product_counts = {}  # product id -> number of users who like it
+        self.products = {}  # product id -> name, image and price from a liked entry
+        self.top_cache = {}
+        self.pending = set()  # user ids to re-read; None means reload everything
+        self.building = False  # A rebuild is downloading; writes are still recorded as pending
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    def set_user(self, user_id, user_items):
+        """Replace one user's likes and adjust the counts. Caller holds the lock."""
+        liked = {}
+        for key, item in (user_items if isinstance(user_items, dict) else {}).items():
+            if isinstance(item, dict):
+                liked[str(item.get('Id') or key)] = item
+        old = self.user_likes.pop(user_id, set())
+        new = set(liked)
+        for product_id in old - new:
+            self.product_counts[product_id] -= 1
+            if not self.product_counts[product_id]:
+                del self.product_counts[product_id]
+                self.products.pop(product_id, None)
+        for product_id in new - old:
+            self.product_counts[product_id] = self.product_counts.get(product_id, 0) + 1
+        for product_id, item in liked.items():
+            # Entries written by older app versions may lack some fields; keep what is known
+            info = self.products.setdefault(product_id, {'Name': None, 'Image': None, 'Price': None})
+            for field, value in (('Name', item.get('Name')),
+                                 ('Image', item.get('image') or item.get('Image')),
+                                 ('Price', item.get('Price'))):
+                if value is not None:
+                    info[field] = value
+        if new:
+            self.user_likes[user_id] = new
+        if old != new:
+            self.top_cache.clear()
+
+    def build(self):
+        # Writes made during the download stay pending and are re-read after it
+        with self.lock:
+            self.pending.clear()
+            self.building = True
+        try:
+            liked_items = db_get('Data/LikedItems') or {}
+        finally:
+            with self.lock:
+                self.building = False
+        with self.lock:
+            self.user_likes = {}
+            self.product_counts = {}
+            self.products = {}
+            self.top_cache.clear()
+            for user_id, user_items in liked_items.items():
+                self.set_user(user_id, user_items)
+            self.built_at = time.monotonic()
+
+    def on_write(self, path, value, merge):
+        """Write listener: remember which users' likes changed"""
+        with self.lock:
+            if self.built_at is None and not self.building:
+                return
+            if path == 'Data/LikedItems' and merge and isinstance(value, dict):
+                self.pending.update(key.split('/')[0] for key in value)
+            elif not path or path == 'Data/LikedItems' or 'Data/LikedItems'.startswith(path + '/'):
+                self.pending.add(None)
+            elif path.startswith('Data/LikedItems/'):
+                self.pending.add(path.split('/')[2])
+
+    def refresh(self):
+        """Build on first use, reload when stale, and re-read pending users"""
+        if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_interval or None in self.pending:
+            self.build()
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            if None in pending:
+                # The whole node was rewritten during build(): reload it on the next refresh
+                pending.discard(None)
+                self.pending.add(None)
+        if not pending:
+            return
+        fetched = db_get_many(f'Data/LikedItems/{user_id}' for user_id in pending)
+        with self.lock:
+            for user_id in pending:
+                self.set_user(user_id, fetched.get(f'Data/LikedItems/{user_id}'))
+
+    def top_products(self, limit=LIKES_TOP_K):
+        """Most liked products, ties by product id"""
+        self.refresh()
+        with self.lock:
+            key = ('products', limit)
+            if key not in self.top_cache:
+                top = heapq.nsmallest(limit, self.product_counts.items(), key=lambda entry: (-entry[1], entry[0]))
+                self.top_cache[key] = [dict(self.products.get(product_id, {}), productId=product_id, likes=likes)
+                                       for product_id, likes in top]
+            return self.top_cache[key]
+
+    def top_users(self, limit=LIKES_TOP_K):
+        """Users with the most liked products, ties by user id"""
+        self.refresh()
+        with self.lock:
+            key = ('users', limit)
+            if key not in self.top_cache:
+                top = heapq.nsmallest(limit, self.user_likes.items(), key=lambda entry: (-len(entry[1]), entry[0]))
+                self.top_cache[key] = [{'userId': user_id, 'likes': len(liked)} for user_id, liked in top]
+            return self.top_cache[key]
+
+    def totals(self):
+        self.refresh()
+        with self.lock:
+            return {
+                'likes': sum(self.product_counts.values()),
+                'products': len(self.product_counts),
+                'users': len(self.user_likes),
+            }
+
+
+likes_leaderboard = LikesLeaderboard()
+write_listeners.append(likes_leaderboard.on_write)
+
+
 @app.route('/liked-items', methods=['GET'])
 def get_liked_items():
     """Get all liked items from Firebase"""
     try:
-        liked_items_ref = db.reference('Data/LikedItems')
-        liked_items = liked_items_ref.get()
+        liked_items = db_get('Data/LikedItems')
 
         if not liked_items:
             return render_template('LikedItems/liked_items.html', error='No liked items found')
@@ -943,42 +3142,230 @@ def get_liked_items():
         return render_template('LikedItems/liked_items.html', error=str(e))
 
 
+@app.route('/liked-items/leaderboard', methods=['GET'])
+def get_likes_leaderboard():
+    """Show the most liked products and the users with the most likes"""
+    try:
+        limit = min(max(request.args.get('limit', LIKES_TOP_K, type=int), 1), LIKES_MAX_TOP_K)
+        products = [dict(product, Image=get_image_path(product.get('Image'), IMAGE_THUMB_WIDTH))
+                    for product in likes_leaderboard.top_products(limit)]
+        return render_template('LikedItems/leaderboard.html',
+                               products=products,
+                               users=likes_leaderboard.top_users(limit),
+                               totals=likes_leaderboard.totals(),
+                               limit=limit)
+    except Exception as e:
+        print(f"Error getting likes leaderboard: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return render_template('LikedItems/leaderboard.html', error=str(e), products=[], users=[])
+
+
+@app.route('/api/liked-items/top', methods=['GET'])
+def api_likes_leaderboard():
+    """JSON top products and users by likes"""
+    limit = min(max(request.args.get('limit', LIKES_TOP_K, type=int), 1), LIKES_MAX_TOP_K)
+    return api_response({
+        'products': likes_leaderboard.top_products(limit),
+        'users': likes_leaderboard.top_users(limit),
+        'totals': likes_leaderboard.totals(),
+    })
+
+
 #################################################################################################################################
 #                                         ORDER BILLS REQUEST MAPPING                                                           #
 #################################################################################################################################
 
 
-@app.route('/orders', methods=['GET'])
-def get_all_orders():
+def parse_order_date(value):
+    """Convert an orderDate cursor value from the query string to a number"""
+    if value in (None, ''):
+        return None
     try:
-        # Get orders from Firebase
-        orders_ref = db.reference('Data/OrderBills')
-        orders = orders_ref.get()
-
-        if not orders:
-            return render_template('OrderBills/orders.html', orders={})
+        return int(value)
+    except ValueError:
+        return float(value)
 
-        # Convert orders to dictionary if it's not already
-        if not isinstance(orders, dict):
-            orders = {}
 
-        # Sort orders by date (newest first) if orderDate exists
-        sorted_orders = {}
-        for order_id, order in orders.items():
-            if not isinstance(order, dict):
-                continue
-            sorted_orders[order_id] = order
+def keyset_sort_key(record_id, record, field):
+    """Sort key used for keyset pagination on a numeric child: (value, record id), missing values as 0"""
+    value = record.get(field) if isinstance(record, dict) else None
+    try:
+        value = float(value) if value else 0
+    except (ValueError, TypeError):
+        value = 0
+    return (value, record_id)
+
+
+def keyset_query(path, field, cursor, newest_first, limit, bound=None):
+    """Read up to limit children of path ordered by field, starting at the cursor (inclusive).
+
+    bound is an optional field value on the far side of the scan (inclusive).
+    """
+    query = db.reference(path).order_by_child(field)
+    if newest_first:
+        if cursor is not None:
+            query = query.end_at(cursor[0])
+        if bound is not None:
+            query = query.start_at(bound)
+        return firebase_call('query', path, query.limit_to_last(limit).get) or {}
+    if cursor is not None:
+        query = query.start_at(cursor[0])
+    if bound is not None:
+        query = query.end_at(bound)
+    return firebase_call('query', path, query.limit_to_first(limit).get) or {}
+
+
+def keyset_chunks(path, field, sort_key, cursor, newest_first, chunk_size, bound=None):
+    """Yield the children of path beyond the cursor in page order, one non-empty list per query.
+
+    Queries can only start at a field value, not at a (value, id) position, so rows sharing
+    the cursor's value are read again and dropped. When a whole chunk is made of them, the
+    next query asks for twice as many rows, so the scan always moves on.
+    """
+    limit = chunk_size
+    while True:
+        batch = keyset_query(path, field, cursor, newest_first, limit, bound)
+        rows = keyset_rows(batch.items(), sort_key, cursor, newest_first)
+        if len(batch) < limit:
+            if rows:
+                yield rows
+            return
+        if rows:
+            yield rows
+            cursor = sort_key(*rows[-1])
+            limit = chunk_size
+        else:
+            limit *= 2
+
+
+def keyset_rows(rows, sort_key, cursor, newest_first, limit=None):
+    """Put (id, record) rows in page order, dropping non-records and rows at or before the cursor.
+
+    With a limit only the first limit rows are kept, without sorting the rest.
+    """
+    rows = ((record_id, record) for record_id, record in rows if isinstance(record, dict))
+    if cursor is not None:
+        if newest_first:
+            rows = (row for row in rows if sort_key(*row) < cursor)
+        else:
+            rows = (row for row in rows if sort_key(*row) > cursor)
+    if limit is not None:
+        pick = heapq.nlargest if newest_first else heapq.nsmallest
+        return pick(limit, rows, key=lambda row: sort_key(*row))
+    return sorted(rows, key=lambda row: sort_key(*row), reverse=newest_first)
+
+
+def keyset_page(collected, sort_key, page_size, newest_first, before, after, resume=None):
+    """Trim rows collected in page order to a page and work out its (newer, older) cursors.
+
+    resume is where scanning stopped early, used when the page did not fill.
+    """
+    if len(collected) > page_size:
+        resume = sort_key(*collected[page_size - 1])
+    collected = collected[:page_size]
+    if newest_first:
+        newer = sort_key(*collected[0]) if collected else before
+        return dict(collected), newer if before is not None else None, resume
+
+    collected.reverse()
+    return dict(collected), resume, sort_key(*collected[-1]) if collected else after
+
+
+def keyset_cursor_args(prefix, cursor):
+    """Query string arguments for a (value, id) cursor, e.g. before/before_id"""
+    if cursor is None:
+        return None
+    value = int(cursor[0]) if float(cursor[0]).is_integer() else cursor[0]
+    return {prefix: value, f'{prefix}_id': cursor[1]}
+
+
+def order_sort_key(order_id, order):
+    """Sort key used for keyset pagination: (orderDate, order id)"""
+    return keyset_sort_key(order_id, order, 'orderDate')
+
+
+def fetch_orders_page(page_size, before=None, after=None, status=None):
+    """Fetch one page of orders (newest first) with keyset pagination on orderDate.
+
+    `before` / `after` are (orderDate, order_id) cursors taken from the last / first
+    row of the page the user is coming from. Orders are read in chunks ordered by
+    orderDate, so only about one page moves over the wire per request.
+    Returns (orders, newer_cursor, older_cursor); a cursor is None when there is nothing
+    further that way. If a status filter runs out of scan chunks before the page fills,
+    the cursor points past the last order scanned so the next page carries on from there.
+    """
+    if database_mirror and database_mirror.covers('Data/OrderBills'):
+        return mirror_orders_page(page_size, before=before, after=after, status=status)
+
+    # Without a status filter one extra row is enough to know whether another page exists
+    chunk_size = page_size + 1 if not status else max(page_size + 1, ORDERS_SCAN_CHUNK)
+    newest_first = after is None
+    cursor = before if newest_first else after
+
+    collected = []
+    chunks = keyset_chunks('Data/OrderBills', 'orderDate', order_sort_key, cursor, newest_first, chunk_size)
+    for _ in range(ORDERS_MAX_SCAN_CHUNKS):
+        rows = next(chunks, None)
+        if rows is None:
+            break
+        collected.extend(row for row in rows if not status or row[1].get('status') == status)
+        if len(collected) > page_size:
+            break
+        cursor = order_sort_key(*rows[-1])
+    else:
+        # Scan budget used up: more orders may match beyond the last one scanned
+        return keyset_page(collected, order_sort_key, page_size, newest_first, before, after, resume=cursor)
+
+    return keyset_page(collected, order_sort_key, page_size, newest_first, before, after)
+
+
+def mirror_orders_page(page_size, before=None, after=None, status=None):
+    """Same contract as fetch_orders_page, served from the live mirror"""
+    newest_first = after is None
+    cursor = before if newest_first else after
+    with database_mirror.lock:
+        all_orders = database_mirror.lookup('Data/OrderBills') or {}
+        rows = ((order_id, order) for order_id, order in all_orders.items()
+                if not status or (isinstance(order, dict) and order.get('status') == status))
+        page = [(order_id, copy.deepcopy(order))
+                for order_id, order in keyset_rows(rows, order_sort_key, cursor, newest_first, limit=page_size + 1)]
+
+    return keyset_page(page, order_sort_key, page_size, newest_first, before, after)
 
-        sorted_orders = dict(
-            sorted(
-                sorted_orders.items(),
-                key=lambda x: float(x[1].get('orderDate', 0)) if x[1].get('orderDate') else 0,
-                reverse=True
-            )
-        )
 
-        return render_template('OrderBills/orders.html', orders=sorted_orders)
+@app.route('/orders', methods=['GET'])
+def get_all_orders():
+    try:
+        # Read pagination and filter parameters
+        status = request.args.get('status') or None
+        if status not in ORDER_STATUSES:
+            status = None
+        page_size = min(max(request.args.get('page_size', ORDERS_PAGE_SIZE, type=int), 1), ORDERS_MAX_PAGE_SIZE)
+
+        before = after = None
+        if request.args.get('before'):
+            before = (parse_order_date(request.args['before']), request.args.get('before_id', ''))
+        elif request.args.get('after'):
+            after = (parse_order_date(request.args['after']), request.args.get('after_id', ''))
+
+        # Get one page of orders from Firebase (newest first)
+        orders, newer, older = fetch_orders_page(page_size, before=before, after=after, status=status)
+
+        # Cursors for the previous/next links
+        newer_cursor = keyset_cursor_args('after', newer)
+        older_cursor = keyset_cursor_args('before', older)
+
+        return render_template('OrderBills/orders.html',
+                               orders=orders,
+                               status=status,
+                               page_size=page_size,
+                               newer_cursor=newer_cursor,
+                               older_cursor=older_cursor)
     except Exception as e:
+        print(f"Error getting orders: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
         return render_template('OrderBills/orders.html', error=str(e), orders={})
 
 @app.route('/orders/<order_id>/update-status', methods=['POST'])
@@ -989,21 +3376,19 @@ def update_order_status(order_id):
         new_status = request.form.get('new_status')
 
         # Kiểm tra trạng thái mới có hợp lệ không
-        valid_statuses = ['PENDING', 'PAID', 'CANCELLED']
-        if new_status not in valid_statuses:
+        if new_status not in ORDER_STATUSES:
             flash('Trạng thái không hợp lệ.', 'error')
             return redirect(url_for('get_all_orders'))
 
         # Lấy thông tin đơn hàng từ Firebase
-        order_ref = db.reference(f'Data/OrderBills/{order_id}')
-        order = order_ref.get()
+        order = db_get(f'Data/OrderBills/{order_id}')
 
         if not order:
             flash('Đơn hàng không tồn tại.', 'error')
             return redirect(url_for('get_all_orders'))
 
         # Cập nhật trạng thái đơn hàng
-        order_ref.update({'status': new_status})
+        db_update(f'Data/OrderBills/{order_id}', {'status': new_status})
 
         flash('Cập nhật trạng thái đơn hàng thành công.', 'success')
         return redirect(url_for('get_all_orders'))
@@ -1015,8 +3400,7 @@ def update_order_status(order_id):
 def get_order_details(order_id):
     """Get detailed information for a specific order"""
     try:
-        order_ref = db.reference(f'Data/OrderBills/{order_id}')
-        order = order_ref.get()
+        order = db_get(f'Data/OrderBills/{order_id}')
         
         if not order:
             return render_template('OrderBills/order_details.html', error='Order not found')
@@ -1037,7 +3421,7 @@ def get_order_details(order_id):
         # Convert drawable paths to web-compatible image paths
         for item in order['items'].values():
             if isinstance(item, dict) and 'image' in item:
-                item['image'] = get_image_path(item['image'])
+                item['image'] = get_image_path(item['image'], IMAGE_THUMB_WIDTH)
             
         return render_template('OrderBills/order_details.html', order=order)
     except Exception as e:
@@ -1052,8 +3436,7 @@ def get_order_details(order_id):
 def delete_order(order_id):
     try:
         # Get the order from the database
-        order_ref = db.reference('Data/OrderBills').child(order_id)
-        order = order_ref.get()
+        order = db_get(f'Data/OrderBills/{order_id}')
 
         if not order:
             flash('Order not found.', 'error')
@@ -1064,13 +3447,11 @@ def delete_order(order_id):
             flash('Only cancelled orders can be deleted.', 'error')
             return redirect(url_for('get_all_orders'))
 
-        # Delete the order
-        order_ref.delete()
-
-        # Delete the order reference from the user's orderBills
+        # Delete the order and its reference from the user's orderBills in one atomic update
+        batch = WriteBatch().delete(f'Data/OrderBills/{order_id}')
         if 'userUId' in order:
-            user_ref = db.reference(f'Data/Users/{order["userUId"]}/orderBills/{order_id}')
-            user_ref.delete()
+            batch.delete(f'Data/Users/{order["userUId"]}/orderBills/{order_id}')
+        batch.commit()
 
         flash('Order deleted successfully.', 'success')
         return redirect(url_for('get_all_orders'))
@@ -1080,17 +3461,259 @@ def delete_order(order_id):
         return redirect(url_for('get_all_orders'))
 
 
+@app.route('/orders/bulk', methods=['POST'])
+def bulk_update_orders():
+    """Change the status of, or delete, many orders in one round trip.
+
+    Accepts form fields (order_ids, action, new_status) or the same keys as JSON.
+    action is 'status' or 'delete'; only cancelled orders are deleted.
+    """
+    payload = request.get_json(silent=True) or {}
+    if payload:
+        order_ids = payload.get('order_ids') or []
+    else:
+        order_ids = request.form.getlist('order_ids')
+        payload = request.form
+    action = payload.get('action')
+    new_status = payload.get('new_status')
+
+    def respond(message, category, status_code=200, **extra):
+        if request.is_json:
+            return jsonify({'message': message, **extra}), status_code
+        flash(message, category)
+        return redirect(request.referrer or url_for('get_all_orders'))
+
+    try:
+        order_ids = list(dict.fromkeys(order_id for order_id in order_ids if order_id))
+        if not order_ids:
+            return respond('No orders selected.', 'error', 400)
+        if action == 'status' and new_status not in ORDER_STATUSES:
+            return respond('Invalid status.', 'error', 400)
+        if action not in ('status', 'delete'):
+            return respond('Invalid bulk action.', 'error', 400)
+
+        # Load the selected orders concurrently
+        orders = db_get_many(f'Data/OrderBills/{order_id}' for order_id in order_ids)
+
+        batch = WriteBatch()
+        skipped = []
+        for order_id in order_ids:
+            order = orders.get(f'Data/OrderBills/{order_id}')
+            if not isinstance(order, dict):
+                skipped.append(order_id)
+            elif action == 'status':
+                batch.set(f'Data/OrderBills/{order_id}/status', new_status)
+            elif order.get('status') != 'CANCELLED':
+                skipped.append(order_id)
+            else:
+                batch.delete(f'Data/OrderBills/{order_id}')
+                if 'userUId' in order:
+                    batch.delete(f'Data/Users/{order["userUId"]}/orderBills/{order_id}')
+        batch.commit()
+
+        done = len(order_ids) - len(skipped)
+        verb = 'updated' if action == 'status' else 'deleted'
+        message = f'{done} orders {verb}.'
+        if skipped:
+            message += f' {len(skipped)} skipped (missing or not cancelled).'
+        return respond(message, 'success', updated=done, skipped=skipped)
+
+    except Exception as e:
+        print(f"Error in bulk order update: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return respond(f'Error updating orders: {str(e)}', 'error', 500)
+
+
 #################################################################################################################################
 #                                         REVIEWS REQUEST MAPPING                                                               #
 #################################################################################################################################
 
 
+def review_sort_key(review_id, review):
+    """Sort key used for keyset pagination: (timestamp, review id)"""
+    return keyset_sort_key(review_id, review, 'timestamp')
+
+
+def review_rating(review):
+    """The review's 1-5 star rating as a number, or None when it is missing or invalid"""
+    try:
+        rating = float(review.get('rating'))
+    except (ValueError, TypeError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
+class ReviewStats:
+    """Per-item review count, average rating, rating histogram and latest review snippet.
+
+    Built from Data/Reviews on first use, then kept current item by item: writes and live
+    mirror events under Data/Reviews mark items pending, and only those are re-read.
+    """
+
+    def __init__(self, rebuild_interval=REVIEW_STATS_REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self.items = {}  # category -> {item_id: summary}
+        self.pending = set()  # (), (category,) or (category, item_id) subtrees to re-read
+        self.building = False  # A rebuild is downloading; writes are still recorded as pending
+        self.built_at = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def summarize_item(reviews):
+        """Collapse one Reviews/<category>/<item_id> node; None when it has no reviews"""
+        histogram = [0] * 5
+        total = 0
+        rated = 0
+        latest = None
+        rows = [(review_id, review) for review_id, review in (reviews or {}).items() if isinstance(review, dict)]
+        for review_id, review in rows:
+            # Reviews without a usable rating are counted, but kept out of the average and histogram
+            rating = review_rating(review)
+            if rating is not None:
+                total += rating
+                rated += 1
+                histogram[int(round(rating)) - 1] += 1
+            if latest is None or review_sort_key(review_id, review) > review_sort_key(*latest):
+                latest = (review_id, review)
+        if not rows:
+            return None
+
+        comment = str(latest[1].get('comment') or '')
+        return {
+            'count': len(rows),
+            'unrated': len(rows) - rated,
+            'average': round(total / rated, 1) if rated else None,
+            'histogram': histogram,  # index 0 = 1 star
+            'latest': {
+                'comment': comment[:REVIEW_SNIPPET_LENGTH],
+                'truncated': len(comment) > REVIEW_SNIPPET_LENGTH,
+                'userName': latest[1].get('userName'),
+                'timestamp': latest[1].get('timestamp'),
+            },
+        }
+
+    def summarize_category(self, items):
+        summaries = {}
+        for item_id, reviews in (items or {}).items():
+            summary = self.summarize_item(reviews) if isinstance(reviews, dict) else None
+            if summary:
+                summaries[item_id] = summary
+        return summaries
+
+    def build(self):
+        """Summarize the whole Data/Reviews tree"""
+        # Writes made during the download stay pending and are re-read after it
+        with self.lock:
+            self.pending.clear()
+            self.building = True
+        try:
+            reviews = db_get('Data/Reviews') or {}
+        finally:
+            with self.lock:
+                self.building = False
+        items = {}
+        for category, category_items in reviews.items():
+            summaries = self.summarize_category(category_items if isinstance(category_items, dict) else {})
+            if summaries:
+                items[category] = summaries
+        with self.lock:
+            self.items = items
+            self.built_at = time.monotonic()
+
+    def on_write(self, path, value, merge):
+        """Write listener: remember which categories or items changed"""
+        with self.lock:
+            if self.built_at is None and not self.building:
+                return
+            if not path or path == 'Data/Reviews' or 'Data/Reviews'.startswith(path + '/'):
+                self.pending.add(())
+            elif path.startswith('Data/Reviews/'):
+                parts = path[len('Data/Reviews/'):].split('/')
+                if len(parts) == 1 and merge and isinstance(value, dict):
+                    # A patch of a category lists the items it touched
+                    self.pending.update((parts[0], key.split('/')[0]) for key in value)
+                else:
+                    self.pending.add(tuple(parts[:2]))
+
+    def refresh(self):
+        """Build on first use, rebuild when stale, and re-summarize pending items"""
+        if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_interval or () in self.pending:
+            self.build()
+        with self.lock:
+            pending, self.pending = self.pending, set()
+            if () in pending:
+                # The whole node was rewritten during build(): reload it on the next refresh
+                pending.discard(())
+                self.pending.add(())
+        if not pending:
+            return
+        fetched = db_get_many('Data/Reviews/' + '/'.join(parts) for parts in pending)
+        with self.lock:
+            for parts in pending:
+                value = fetched.get('Data/Reviews/' + '/'.join(parts))
+                if len(parts) == 1:
+                    summaries = self.summarize_category(value if isinstance(value, dict) else {})
+                    if summaries:
+                        self.items[parts[0]] = summaries
+                    else:
+                        self.items.pop(parts[0], None)
+                    continue
+                category, item_id = parts
+                summary = self.summarize_item(value) if isinstance(value, dict) else None
+                if summary:
+                    self.items.setdefault(category, {})[item_id] = summary
+                elif category in self.items:
+                    self.items[category].pop(item_id, None)
+                    if not self.items[category]:
+                        del self.items[category]
+
+    def summary(self):
+        """Return {category: {item_id: summary}} for the reviews page"""
+        self.refresh()
+        with self.lock:
+            return {category: dict(items) for category, items in sorted(self.items.items())}
+
+    def item(self, category, item_id):
+        self.refresh()
+        with self.lock:
+            return self.items.get(category, {}).get(item_id)
+
+
+review_stats = ReviewStats()
+write_listeners.append(review_stats.on_write)
+
+
+def fetch_reviews_page(category, item_id, page_size, before=None, after=None):
+    """Fetch one page of an item's reviews (newest first) with keyset pagination on timestamp.
+
+    `before` / `after` are (timestamp, review_id) cursors, as for orders.
+    Returns (reviews, newer_cursor, older_cursor), like fetch_orders_page.
+    """
+    path = f'Data/Reviews/{category}/{item_id}'
+    newest_first = after is None
+    cursor = before if newest_first else after
+
+    if database_mirror and database_mirror.covers(path):
+        with database_mirror.lock:
+            batch = copy.deepcopy(database_mirror.lookup(path) or {})
+        rows = keyset_rows(batch.items(), review_sort_key, cursor, newest_first, limit=page_size + 1)
+    else:
+        # One row past the page tells whether there is another page that way
+        rows = []
+        for chunk in keyset_chunks(path, 'timestamp', review_sort_key, cursor, newest_first, page_size + 1):
+            rows.extend(chunk)
+            if len(rows) > page_size:
+                break
+    return keyset_page(rows, review_sort_key, page_size, newest_first, before, after)
+
+
 @app.route('/reviews', methods=['GET'])
+@cached_page('Data/Reviews')
 def get_all_reviews_items():
-    """Get all reviews items from Firebase"""
+    """Show review statistics for every reviewed item"""
     try:
-        reviews_items_ref = db.reference('Data/Reviews')
-        reviews_items = reviews_items_ref.get()
+        reviews_items = review_stats.summary()
 
         if not reviews_items:
             return render_template('Reviews/reviews_items.html', error='No reviews items found')
@@ -1105,21 +3728,36 @@ def get_all_reviews_items():
 
 @app.route('/reviews/<category>/<item_id>', methods=['GET'])
 def get_reviews_item_details(category, item_id):
-    """Get detailed reviews for a specific item"""
+    """Get one page of reviews for a specific item, newest first"""
     try:
-        reviews_ref = db.reference(f'Data/Reviews/{category}/{item_id}')
-        reviews = reviews_ref.get()
+        page_size = min(max(request.args.get('page_size', REVIEWS_PAGE_SIZE, type=int), 1), REVIEWS_MAX_PAGE_SIZE)
+        before = after = None
+        if request.args.get('before'):
+            before = (parse_order_date(request.args['before']), request.args.get('before_id', ''))
+        elif request.args.get('after'):
+            after = (parse_order_date(request.args['after']), request.args.get('after_id', ''))
+
+        reviews, newer, older = fetch_reviews_page(category, item_id, page_size, before=before, after=after)
+        stats = review_stats.item(category, item_id)
 
-        if not reviews:
+        if not reviews and not stats:
             return render_template('Reviews/reviews_items_details.html', 
                                  error='No reviews found for this item',
                                  category=category,
                                  item_id=item_id)
 
+        # Cursors for the previous/next links
+        newer_cursor = keyset_cursor_args('after', newer)
+        older_cursor = keyset_cursor_args('before', older)
+
         return render_template('Reviews/reviews_items_details.html',
                              reviews=reviews,
+                             stats=stats,
                              category=category,
-                             item_id=item_id)
+                             item_id=item_id,
+                             page_size=page_size,
+                             newer_cursor=newer_cursor,
+                             older_cursor=older_cursor)
     except Exception as e:
         print(f"Error getting reviews for {category}/{item_id}: {e}")
         import traceback
@@ -1135,17 +3773,112 @@ def get_reviews_item_details(category, item_id):
 #################################################################################################################################
 
 
+class SalesAggregator:
+    """Per-day, per-item and per-category sales totals kept up to date from Data/SoldItems.
+
+    Only dates that are new since the last refresh (plus the most recent date, which
+    may still be receiving sales) are downloaded; older days are summarized once.
+    """
+
+    def __init__(self, refresh_interval=SALES_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.days = {}  # date -> {'date', 'distinct_items', 'total_sales', 'items': {product_id: sales}}
+        self.item_totals = {}
+        self.category_totals = {}
+        self.cached_rollup = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def summarize_day(date, sold_items):
+        """Collapse one SoldItems/<date> node into per-item totals"""
+        items = {}
+        for item_data in (sold_items or {}).values():
+            if not isinstance(item_data, dict):
+                continue
+            product_id = item_data.get('Id', '')
+            items[product_id] = items.get(product_id, 0) + (item_data.get('Sales') or 0)
+        return {
+            'date': date,
+            'distinct_items': len(sold_items or {}),
+            'total_sales': sum(items.values()),
+            'items': items,
+        }
+
+    def apply_day(self, date, summary):
+        """Replace the summary of a date and adjust the running totals. Caller holds the lock."""
+        previous = self.days.pop(date, None)
+        if previous:
+            self.add_totals(previous['items'], -1)
+        if summary:
+            self.days[date] = summary
+            self.add_totals(summary['items'], 1)
+        self.cached_rollup = None
+
+    def add_totals(self, items, sign):
+        for product_id, sales in items.items():
+            category_id = product_id.split('/')[0] if '/' in product_id else 'Unknown'
+            for totals, key in ((self.item_totals, product_id), (self.category_totals, category_id)):
+                totals[key] = totals.get(key, 0) + sign * sales
+                if not totals[key]:
+                    del totals[key]
+
+    def refresh(self, force=False):
+        """Pull dates that appeared since the last refresh"""
+        now = time.monotonic()
+        if not force and self.refreshed_at is not None and now - self.refreshed_at < self.refresh_interval:
+            return
+
+        dates = db_keys('Data/SoldItems')
+        with self.lock:
+            known = set(self.days)
+        latest = max(dates) if dates else None
+        fetched = db_get_many(f'Data/SoldItems/{date}' for date in dates if date not in known or date == latest)
+        summaries = {
+            path.rsplit('/', 1)[1]: self.summarize_day(path.rsplit('/', 1)[1], sold_items)
+            for path, sold_items in fetched.items()
+        }
+
+        with self.lock:
+            for date in known - set(dates):
+                self.apply_day(date, None)
+            for date, summary in summaries.items():
+                self.apply_day(date, summary)
+            self.refreshed_at = now
+
+    def rollup(self):
+        """Return the cached summary rows served to the sold items page"""
+        self.refresh()
+        with self.lock:
+            if self.cached_rollup is None:
+                days = sorted(
+                    ({key: value for key, value in day.items() if key != 'items'} for day in self.days.values()),
+                    key=lambda day: day['date'],
+                    reverse=True,
+                )
+                self.cached_rollup = {
+                    'days': days,
+                    'total_sales': sum(day['total_sales'] for day in days),
+                    'item_totals': sorted(self.item_totals.items(), key=lambda entry: entry[1], reverse=True),
+                    'category_totals': sorted(self.category_totals.items(), key=lambda entry: entry[1], reverse=True),
+                }
+            return self.cached_rollup
+
+
+sales_aggregator = SalesAggregator()
+
+
 @app.route('/sold-items', methods=['GET'])
+@cached_page('Data/SoldItems', 'Data/CategoriesItems')
 def get_sold_items():
-    """Get all sold items from Firebase"""
+    """Get sales totals per day, item and category"""
     try:
-        sold_items_ref = db.reference('Data/SoldItems')
-        sold_items = sold_items_ref.get()
+        sales = sales_aggregator.rollup()
 
-        if not sold_items:
+        if not sales['days']:
             return render_template('SoldItems/sold_items.html', error='No sold items found')
 
-        return render_template('SoldItems/sold_items.html', sold_items=sold_items)
+        return render_template('SoldItems/sold_items.html', sales=sales)
     except Exception as e:
         print(f"Error getting sold items: {e}")
         import traceback
@@ -1153,45 +3886,64 @@ def get_sold_items():
         return render_template('SoldItems/sold_items.html', error=str(e))
 
 
+def sold_item_product(item_data):
+    """(category_id, item_id) from a sold item's "<category_id>/<item_id>" Id, or None when malformed"""
+    parts = str(item_data.get('Id') or '').split('/')
+    return (parts[0], parts[1]) if len(parts) == 2 and all(parts) else None
+
+
+def enrich_sold_items(sold_items):
+    """Add category and item details to one day of sold items.
+
+    Entries that are not records are skipped; records with a malformed Id are kept as
+    Unknown Category / Unknown Item, like the sales totals do.
+    """
+    # Fetch only the categories and items sold on this date
+    product_ids = {item_key: sold_item_product(item_data) for item_key, item_data in sold_items.items()
+                   if isinstance(item_data, dict)}
+    paths = []
+    for category_id, item_id in filter(None, product_ids.values()):
+        paths.append(f'Data/Categories/{category_id}')
+        paths.append(f'Data/CategoriesItems/{category_id}/{item_id}')
+    details = db_get_many(paths)
+    
+    # Enrich sold items with category and item details
+    enriched_items = {}
+    for item_key, item_data in sold_items.items():
+        if item_key not in product_ids:
+            continue
+        # Parse category and item ID from the composite key
+        category_id, item_id = product_ids[item_key] or (None, None)
+        
+        # Get category details
+        category = details.get(f'Data/Categories/{category_id}') or {}
+        
+        # Get item details
+        item_details = details.get(f'Data/CategoriesItems/{category_id}/{item_id}') or {}
+        
+        enriched_items[item_key] = {
+            **item_data,
+            'category': category.get('Name', 'Unknown Category'),
+            'itemName': item_details.get('Name', 'Unknown Item'),
+            'price': item_details.get('Price', 0),
+            'unit': item_details.get('Unit', ''),
+            'image': get_image_path(item_details.get('Image', ''), IMAGE_THUMB_WIDTH)
+        }
+    return enriched_items
+
+
 @app.route('/sold-items/<date>', methods=['GET'])
 def get_sold_items_details(date):
     """Get detailed sold items for a specific date"""
     try:
-        sold_items_ref = db.reference(f'Data/SoldItems/{date}')
-        sold_items = sold_items_ref.get()
+        sold_items = db_get(f'Data/SoldItems/{date}')
 
         if not sold_items:
             return render_template('SoldItems/sold_items_details.html', 
                                  error='No sold items found for this date',
                                  date=date)
 
-        # Get category and item details for each sold item
-        categories_ref = db.reference('Data/Categories')
-        categories = categories_ref.get() or {}
-        
-        items_ref = db.reference('Data/CategoriesItems')
-        all_items = items_ref.get() or {}
-        
-        # Enrich sold items with category and item details
-        enriched_items = {}
-        for item_key, item_data in sold_items.items():
-            # Parse category and item ID from the composite key
-            category_id, item_id = item_data['Id'].split('/')
-            
-            # Get category details
-            category = categories.get(category_id, {})
-            
-            # Get item details
-            item_details = all_items.get(category_id, {}).get(item_id, {})
-            
-            enriched_items[item_key] = {
-                **item_data,
-                'category': category.get('Name', 'Unknown Category'),
-                'itemName': item_details.get('Name', 'Unknown Item'),
-                'price': item_details.get('Price', 0),
-                'unit': item_details.get('Unit', ''),
-                'image': get_image_path(item_details.get('Image', ''))
-            }
+        enriched_items = enrich_sold_items(sold_items)
 
         return render_template('SoldItems/sold_items_details.html',
                              items=enriched_items,
@@ -1212,16 +3964,29 @@ def get_sold_items_details(date):
 
 @app.route('/users', methods=['GET'])
 def get_all_users():
-    """Get all users from Firebase"""
+    """List users one page at a time; ids come from a shallow read and only the page's users are downloaded"""
     try:
-        # Get reference to the Users node
-        users_ref = db.reference('Data/Users')
-        # Get all users
-        users = users_ref.get()
-        if not users:
+        user_ids = sorted(db_keys('Data/Users'))
+        if not user_ids:
             return render_template('Users/users.html', error='No users found')
-        
-        return render_template('Users/users.html', users=users)
+
+        page_count = -(-len(user_ids) // USERS_PAGE_SIZE)
+        page = min(max(request.args.get('page', 1, type=int), 1), page_count)
+        page_ids = user_ids[(page - 1) * USERS_PAGE_SIZE:page * USERS_PAGE_SIZE]
+
+        fetched = db_get_key_range('Data/Users', page_ids[0], page_ids[-1])
+        # Numeric-looking keys sort differently in Firebase; read any the range query missed
+        missing = [user_id for user_id in page_ids if user_id not in fetched]
+        if missing:
+            fetched.update({path.rsplit('/', 1)[1]: user
+                            for path, user in db_get_many(f'Data/Users/{user_id}' for user_id in missing).items()})
+        users = {user_id: fetched[user_id] for user_id in page_ids if isinstance(fetched.get(user_id), dict)}
+
+        return render_template('Users/users.html',
+                               users=users,
+                               page=page,
+                               page_count=page_count,
+                               total_users=len(user_ids))
     except Exception as e:
         print(f"Error getting users: {e}")
         import traceback
@@ -1233,8 +3998,7 @@ def get_all_users():
 def get_user_by_id(user_id):
     """Get a specific user by their ID"""
     try:
-        user_ref = db.reference(f'Data/Users/{user_id}')
-        user = user_ref.get()
+        user = db_get(f'Data/Users/{user_id}')
         if user is None:
             return render_template('Users/user.html', error='User not found')
         return render_template('Users/user.html', user=user)
@@ -1249,38 +4013,26 @@ def get_user_by_id(user_id):
 def get_user_orders(user_id):
     """Get basic order information for a user"""
     try:
-        # Get user's order IDs from Data/Users
-        user_ref = db.reference(f'Data/Users/{user_id}')
-        user_data = user_ref.get()
-        
-        if not user_data or 'orderBills' not in user_data:
-            return render_template('Users/user_orders.html', error='No orders found for this user')
-            
-        user_order_ids = user_data['orderBills']
-        if not user_order_ids:
+        # Get user's order IDs from Data/Users (keys only)
+        order_ids = db_keys(f'Data/Users/{user_id}/orderBills')
+        if not order_ids:
             return render_template('Users/user_orders.html', error='No orders found for this user')
             
-        # If orderBills is a reference, get its value
-        if isinstance(user_order_ids, firebase_admin.db.Reference):
-            user_order_ids = user_order_ids.get('/')
-            
-        # Get full order details from Data/OrderBills
-        orders_ref = db.reference('Data/OrderBills')
-        all_orders = orders_ref.get() or {}
+        # Fetch only this user's orders from Data/OrderBills
+        fetched = db_get_many(f'Data/OrderBills/{order_id}' for order_id in order_ids)
         
-        # Filter orders for this user and get basic info
+        # Get basic info for each order
         user_orders = {}
-        if isinstance(user_order_ids, dict):
-            for order_id, _ in user_order_ids.items():
-                if order_id in all_orders:
-                    order = all_orders[order_id]
-                    # Only include basic order information
-                    user_orders[order_id] = {
-                        'orderBillId': order.get('orderBillId', ''),
-                        'orderDate': order.get('orderDate', ''),
-                        'status': order.get('status', ''),
-                        'totalPrice': order.get('totalPrice', 0)
-                    }
+        for order_id in order_ids:
+            order = fetched.get(f'Data/OrderBills/{order_id}')
+            if isinstance(order, dict):
+                # Only include basic order information
+                user_orders[order_id] = {
+                    'orderBillId': order.get('orderBillId', ''),
+                    'orderDate': order.get('orderDate', ''),
+                    'status': order.get('status', ''),
+                    'totalPrice': order.get('totalPrice', 0)
+                }
         
         return render_template('Users/user_orders.html', orders=user_orders, user_id=user_id)
     except Exception as e:
@@ -1290,7 +4042,767 @@ def get_user_orders(user_id):
         print(f"Traceback: {traceback.format_exc()}")
         return render_template('Users/user_orders.html', error=str(e))
 
+#################################################################################################################################
+#                                         EXPORT REQUEST MAPPING                                                                #
+#################################################################################################################################
+
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def parse_export_range():
+    """Read the optional start/end (YYYY-MM-DD, inclusive) query parameters"""
+    start = request.args.get('start') or None
+    end = request.args.get('end') or None
+    for value in (start, end):
+        if value:
+            datetime.strptime(value, '%Y-%m-%d')
+    return start, end
+
+
+def date_to_millis(value, end_of_day=False):
+    """Local midnight (or the last millisecond of the day) of a YYYY-MM-DD date as a timestamp in ms"""
+    day = datetime.strptime(value, '%Y-%m-%d')
+    if end_of_day:
+        day += timedelta(days=1)
+    return int(day.timestamp() * 1000) - (1 if end_of_day else 0)
+
+
+def iter_orders(start_ms=None, end_ms=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield (order_id, order) oldest first, reading OrderBills in orderDate-ordered chunks"""
+    # Every order id sorts after '', so orders placed exactly at start_ms are included
+    cursor = (start_ms, '') if start_ms is not None else None
+    for rows in keyset_chunks('Data/OrderBills', 'orderDate', order_sort_key, cursor, False, chunk_size, end_ms):
+        yield from rows
+
+
+def iter_children(path, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield (key, value) for the children of a path, reading them in key-ordered chunks"""
+    ref = db.reference(path)
+    last_key = None
+    while True:
+        query = ref.order_by_key()
+        if last_key is not None:
+            query = query.start_at(last_key)
+        batch = firebase_call('query', path, query.limit_to_first(chunk_size + (last_key is not None)).get) or {}
+        rows = [(key, value) for key, value in batch.items() if key != last_key]
+        yield from rows
+        if len(batch) < chunk_size or not rows:
+            return
+        last_key = rows[-1][0]
+
+
+def format_export_rows(rows, columns, export_format):
+    """Serialize dict rows as CSV (with a header) or NDJSON, one chunk per row"""
+    if export_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(name, rows, columns, export_format):
+    """Stream rows to the client as a file download"""
+    body = stream_with_context(format_export_rows(rows, columns, export_format))
+    response = Response(body, mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let proxies pass chunks through as they are produced
+    return response
+
+
+ORDER_EXPORT_COLUMNS = ['orderBillId', 'orderDate', 'status', 'totalPrice', 'userUId', 'itemCount']
+SOLD_ITEM_EXPORT_COLUMNS = ['date', 'productId', 'category', 'itemName', 'sales', 'price', 'unit', 'revenue']
+USER_EXPORT_COLUMNS = ['userUId', 'FirstName', 'LastName', 'Email', 'PhoneNumber', 'address', 'orderCount']
+
+
+@app.route('/export/orders.<export_format>', methods=['GET'])
+def export_orders(export_format):
+    """Stream orders in a date range (optionally filtered by status)"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 404
+    try:
+        start, end = parse_export_range()
+    except ValueError:
+        return jsonify({'error': 'Dates must use YYYY-MM-DD'}), 400
+    status = request.args.get('status') or None
+
+    def rows():
+        for order_id, order in iter_orders(date_to_millis(start) if start else None,
+                                           date_to_millis(end, end_of_day=True) if end else None):
+            if status and order.get('status') != status:
+                continue
+            yield {
+                'orderBillId': order.get('orderBillId', order_id),
+                'orderDate': format_datetime(order.get('orderDate')),
+                'status': order.get('status', ''),
+                'totalPrice': order.get('totalPrice', 0),
+                'userUId': order.get('userUId', ''),
+                'itemCount': len(order.get('items') or {}),
+            }
+
+    return export_response('orders', rows(), ORDER_EXPORT_COLUMNS, export_format)
+
+
+@app.route('/export/sold-items.<export_format>', methods=['GET'])
+def export_sold_items(export_format):
+    """Stream enriched sold items for a date range, one day at a time"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 404
+    try:
+        start, end = parse_export_range()
+    except ValueError:
+        return jsonify({'error': 'Dates must use YYYY-MM-DD'}), 400
+
+    dates = sorted(date for date in db_keys('Data/SoldItems')
+                   if (not start or date >= start) and (not end or date <= end))
+
+    def rows():
+        for date in dates:
+            sold_items = firebase_call('get', 'Data/SoldItems', db.reference(f'Data/SoldItems/{date}').get) or {}
+            for item in enrich_sold_items(sold_items).values():
+                sales = item.get('Sales') or 0
+                yield {
+                    'date': date,
+                    'productId': item.get('Id', ''),
+                    'category': item['category'],
+                    'itemName': item['itemName'],
+                    'sales': sales,
+                    'price': item['price'],
+                    'unit': item['unit'],
+                    'revenue': round(as_number(sales) * as_number(item['price']), 2),
+                }
+
+    return export_response('sold_items', rows(), SOLD_ITEM_EXPORT_COLUMNS, export_format)
+
+
+@app.route('/export/users.<export_format>', methods=['GET'])
+def export_users(export_format):
+    """Stream all users"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 404
+
+    def rows():
+        for user_id, user in iter_children('Data/Users'):
+            if not isinstance(user, dict):
+                continue
+            yield {
+                'userUId': user_id,
+                'FirstName': user.get('FirstName', ''),
+                'LastName': user.get('LastName', ''),
+                'Email': user.get('Email', ''),
+                'PhoneNumber': user.get('PhoneNumber', ''),
+                'address': user.get('address', ''),
+                'orderCount': len(user.get('orderBills') or {}),
+            }
+
+    return export_response('users', rows(), USER_EXPORT_COLUMNS, export_format)
+
+
+#################################################################################################################################
+#                                         SEARCH REQUEST MAPPING                                                                #
+#################################################################################################################################
+
+
+def tokenize(text):
+    """Lowercase word tokens of a string"""
+    return re.findall(r'\w+', str(text).lower()) if text else []
+
+
+class SearchIndex:
+    """In-memory inverted index over items, users, orders and reviews with prefix search.
+
+    Documents are keyed '<kind>:<database key>' and grouped by every key prefix, so
+    re-indexing a subtree only touches the documents under it. Writes made through the
+    controller mark the touched subtree as pending; pending subtrees are re-read and
+    re-indexed before the next query. The first query waits for the initial build; after
+    that the whole index is rebuilt in a background thread every SEARCH_REBUILD_INTERVAL
+    while queries keep using the current one.
+    """
+
+    # kind -> (database root, key depth, key field names)
+    SOURCES = {
+        'item': ('Data/CategoriesItems', 2, ['Type', 'Id']),
+        'user': ('Data/Users', 1, ['userUId']),
+        'order': ('Data/OrderBills', 1, ['orderBillId']),
+        'review': ('Data/Reviews', 3, ['category', 'itemId', 'reviewId']),
+    }
+
+    def __init__(self, rebuild_interval=SEARCH_REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self.documents = {}   # doc_id -> {'kind', 'key', 'title', 'subtitle', 'title_tokens'}
+        self.doc_tokens = {}  # doc_id -> set of tokens
+        self.postings = {}    # token -> set of doc_ids
+        self.by_prefix = {}   # (kind, key prefix parts) -> set of doc_ids under that prefix
+        self.sorted_tokens = []
+        self.sorted_dirty = False
+        self.pending = set()  # (kind, key parts) subtrees to re-read
+        self.building = False  # A rebuild is downloading; writes are still recorded as pending
+        self.built_at = None
+        self.rebuild_thread = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def describe(kind, key, record):
+        """Return (title, subtitle, searchable text) for a record"""
+        if kind == 'item':
+            return (record.get('Name', key), record.get('Description', ''),
+                    [key, record.get('Name'), record.get('Description')])
+        if kind == 'user':
+            name = f"{record.get('FirstName', '')} {record.get('LastName', '')}".strip() or key
+            return (name, record.get('Email', ''),
+                    [key, record.get('FirstName'), record.get('LastName'), record.get('Email'), record.get('PhoneNumber')])
+        if kind == 'order':
+            return (key, f"{record.get('status', '')} - {record.get('userUId', '')}",
+                    [key, record.get('orderBillId'), record.get('userUId'), record.get('status')])
+        comment = str(record.get('comment') or '')
+        return (comment[:80] or key, f"{record.get('userName', '')} on {key.rsplit('/', 1)[0]}",
+                [comment, record.get('userName')])
+
+    def add(self, kind, key, record):
+        """Index one record. Caller holds the lock."""
+        doc_id = f'{kind}:{key}'
+        self.remove(doc_id)
+        if not isinstance(record, dict):
+            return
+        title, subtitle, fields = self.describe(kind, key, record)
+        tokens = set()
+        for field in fields:
+            tokens.update(tokenize(field))
+        self.documents[doc_id] = {'kind': kind, 'key': key, 'title': title, 'subtitle': subtitle,
+                                  'title_tokens': set(tokenize(title))}
+        self.doc_tokens[doc_id] = tokens
+        parts = tuple(key.split('/'))
+        for length in range(len(parts)):
+            self.by_prefix.setdefault((kind, parts[:length]), set()).add(doc_id)
+        for token in tokens:
+            if token not in self.postings:
+                self.postings[token] = set()
+                self.sorted_dirty = True
+            self.postings[token].add(doc_id)
+
+    def remove(self, doc_id):
+        """Drop one document. Caller holds the lock."""
+        doc = self.documents.pop(doc_id, None)
+        if doc is not None:
+            parts = tuple(doc['key'].split('/'))
+            for length in range(len(parts)):
+                docs = self.by_prefix.get((doc['kind'], parts[:length]))
+                if docs is not None:
+                    docs.discard(doc_id)
+                    if not docs:
+                        del self.by_prefix[(doc['kind'], parts[:length])]
+        for token in self.doc_tokens.pop(doc_id, ()):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self.postings[token]
+                    self.sorted_dirty = True
+
+    def index_subtree(self, kind, parts, value):
+        """Replace every document under kind/parts with the records found in value"""
+        _, depth, key_fields = self.SOURCES[kind]
+        prefix = '/'.join(parts)
+        with self.lock:
+            if len(parts) == depth:
+                stale = [f'{kind}:{prefix}']
+            else:
+                stale = list(self.by_prefix.get((kind, tuple(parts)), ()))
+            for doc_id in stale:
+                self.remove(doc_id)
+            if len(parts) == depth:
+                if isinstance(value, dict):
+                    record = dict(value)
+                    for field, key in zip(key_fields, parts):
+                        record.setdefault(field, key)
+                    self.add(kind, prefix, record)
+            else:
+                for key, record in flatten_records(value, depth - len(parts), key_fields[len(parts):]):
+                    self.add(kind, f'{prefix}/{key}' if prefix else key, record)
+
+    def build(self):
+        """(Re)build the whole index from Firebase into a fresh index, then swap it in"""
+        # Writes made during the download stay pending and are re-indexed after it
+        with self.lock:
+            self.pending.clear()
+            self.building = True
+        try:
+            roots = {kind: source[0] for kind, source in self.SOURCES.items()}
+            values = db_get_many(roots.values())
+            fresh = SearchIndex(self.rebuild_interval)
+            for kind, root in roots.items():
+                fresh.index_subtree(kind, [], values.get(root))
+        finally:
+            with self.lock:
+                self.building = False
+        with self.lock:
+            self.documents = fresh.documents
+            self.doc_tokens = fresh.doc_tokens
+            self.postings = fresh.postings
+            self.by_prefix = fresh.by_prefix
+            self.sorted_dirty = True
+            self.built_at = time.monotonic()
+
+    def start_rebuild(self):
+        """Rebuild in a background thread unless one is already running"""
+        with self.lock:
+            if self.rebuild_thread is None or not self.rebuild_thread.is_alive():
+                self.rebuild_thread = threading.Thread(target=self.rebuild, name='search-rebuild', daemon=True)
+                self.rebuild_thread.start()
+            return self.rebuild_thread
+
+    def rebuild(self):
+        try:
+            self.build()
+        except Exception as e:
+            print(f"Error rebuilding the search index: {e}")
+            import traceback
+            print(f"Traceback: {traceback.format_exc()}")
+
+    def on_write(self, path, value, merge):
+        """Write listener: remember which subtree changed"""
+        if self.built_at is None and not self.building:
+            return
+        if merge and isinstance(value, dict):
+            # An update touches only the children it names (root-level multi-path updates included)
+            for key, child in value.items():
+                self.on_write(f"{path}/{key.strip('/')}".strip('/'), child, False)
+            return
+        for kind, (root, depth, _) in self.SOURCES.items():
+            if path == root or path.startswith(root + '/'):
+                parts = [part for part in path[len(root):].split('/') if part][:depth]
+                with self.lock:
+                    self.pending.add((kind, tuple(parts)))
+            elif not path or root.startswith(path + '/'):
+                with self.lock:
+                    self.pending.add((kind, ()))
+
+    def refresh(self):
+        """Build on first use, start a background rebuild when stale, and re-index pending subtrees"""
+        if self.built_at is None:
+            self.start_rebuild().join()
+        elif time.monotonic() - self.built_at > self.rebuild_interval:
+            self.start_rebuild()
+        with self.lock:
+            pending, self.pending = self.pending, set()
+        if not pending:
+            return
+        paths = {(kind, parts): '/'.join([self.SOURCES[kind][0], *parts]) for kind, parts in pending}
+        values = db_get_many(paths.values())
+        for (kind, parts), path in paths.items():
+            self.index_subtree(kind, list(parts), values.get(path))
+
+    def expand(self, token, limit=200):
+        """Indexed tokens starting with token. Caller holds the lock."""
+        if self.sorted_dirty:
+            self.sorted_tokens = sorted(self.postings)
+            self.sorted_dirty = False
+        start = bisect.bisect_left(self.sorted_tokens, token)
+        matches = []
+        for candidate in self.sorted_tokens[start:start + limit]:
+            if not candidate.startswith(token):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, kinds=None, limit=SEARCH_MAX_RESULTS):
+        """Return ranked documents matching every query token (exact or prefix)"""
+        self.refresh()
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self.lock:
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for candidate in self.expand(token):
+                    weight = 3.0 if candidate == token else 1.0
+                    for doc_id in self.postings.get(candidate, ()):
+                        token_scores[doc_id] = max(token_scores.get(doc_id, 0), weight)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: score + token_scores[doc_id]
+                              for doc_id, score in scores.items() if doc_id in token_scores}
+                if not scores:
+                    return []
+
+            results = []
+            for doc_id, score in scores.items():
+                doc = self.documents[doc_id]
+                if kinds and doc['kind'] not in kinds:
+                    continue
+                # Boost documents whose title contains the query words
+                score += sum(1.0 for token in tokens if token in doc['title_tokens'])
+                results.append((score, doc))
+            best = heapq.nlargest(limit, results, key=lambda result: (result[0], result[1]['title']))
+            return [{**{k: v for k, v in doc.items() if k != 'title_tokens'}, 'score': score} for score, doc in best]
+
+    def stats(self):
+        with self.lock:
+            return {'documents': len(self.documents), 'tokens': len(self.postings), 'pending': len(self.pending)}
+
+
+search_index = SearchIndex()
+write_listeners.append(search_index.on_write)
+
+
+def search_result_url(result):
+    """Admin page for a search result"""
+    key = result['key']
+    if result['kind'] == 'item':
+        category_id, item_id = key.split('/', 1)
+        return url_for('edit_item_form', category_id=category_id, item_id=item_id)
+    if result['kind'] == 'user':
+        return url_for('get_user_by_id', user_id=key)
+    if result['kind'] == 'order':
+        return url_for('get_order_details', order_id=key)
+    category, item_id, _ = key.split('/', 2)
+    return url_for('get_reviews_item_details', category=category, item_id=item_id)
+
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Search products, users, orders and reviews"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    try:
+        started = time.perf_counter()
+        results = search_index.search(query, kinds={kind} if kind else None) if query else []
+        for result in results:
+            result['url'] = search_result_url(result)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return render_template('Search/search.html', query=query, kind=kind,
+                               results=results, elapsed_ms=elapsed_ms)
+    except Exception as e:
+        print(f"Error searching for {query}: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return render_template('Search/search.html', query=query, kind=kind, results=[], error=str(e))
+
+
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    """JSON search results"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    limit = min(max(request.args.get('limit', 20, type=int), 1), SEARCH_MAX_RESULTS)
+    results = search_index.search(query, kinds={kind} if kind else None, limit=limit) if query else []
+    for result in results:
+        result['url'] = search_result_url(result)
+    return api_response({'data': results, 'count': len(results)})
+
+
+#################################################################################################################################
+#                                         JSON API REQUEST MAPPING                                                              #
+#################################################################################################################################
+
+
+def parse_coupon_date(value):
+    """Return a YYYY-MM-DD coupon date as a datetime, or None when it is missing or malformed"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def coupon_status(coupon, current_date):
+    """Return upcoming/active/expired for a coupon on the given YYYY-MM-DD date"""
+    if coupon.get('startDate', '') > current_date:
+        return 'upcoming'
+    if coupon.get('endDate', '') < current_date:
+        return 'expired'
+    return 'active'
+
+
+def flatten_records(tree, depth, key_fields):
+    """Flatten a nested {key: {key: record}} tree into (id, record) rows.
+
+    Ids join the nested keys with '/', and each key is also copied into the
+    record under the matching name from key_fields.
+    """
+    rows = []
+
+    def walk(node, keys):
+        if len(keys) == depth:
+            if isinstance(node, dict):
+                record = dict(node)
+                for field, key in zip(key_fields, keys):
+                    record.setdefault(field, key)
+                rows.append(('/'.join(keys), record))
+            return
+        if isinstance(node, dict):
+            for key, child in node.items():
+                walk(child, keys + [key])
+
+    walk(tree or {}, [])
+    return rows
+
+
+def api_rows(collection):
+    """Load a collection as a list of (id, record) rows"""
+    if collection == 'categories':
+        return flatten_records(db_get('Data/Categories'), 1, ['Id'])
+    if collection == 'items':
+        return flatten_records(db_get('Data/CategoriesItems'), 2, ['Type', 'Id'])
+    if collection == 'orders':
+        return flatten_records(db_get('Data/OrderBills'), 1, ['orderBillId'])
+    if collection == 'users':
+        return flatten_records(db_get('Data/Users'), 1, ['userUId'])
+    if collection == 'coupons':
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        rows = flatten_records(db_get('Data/Coupons'), 1, ['Id'])
+        for _, coupon in rows:
+            coupon['status'] = coupon_status(coupon, current_date)
+        return rows
+    if collection == 'reviews':
+        return flatten_records(db_get('Data/Reviews'), 3, ['category', 'itemId', 'reviewId'])
+    if collection == 'sold-items':
+        return flatten_records(db_get('Data/SoldItems'), 2, ['date', 'saleId'])
+    if collection == 'liked-items':
+        return flatten_records(db_get('Data/LikedItems'), 2, ['userUId', 'itemId'])
+    return None
+
+
+API_COLLECTIONS = ['categories', 'items', 'orders', 'users', 'coupons', 'reviews', 'sold-items', 'liked-items']
+API_RESERVED_ARGS = {'limit', 'cursor', 'sort', 'fields'}
+
+
+def api_sort_value(value):
+    """Comparable sort value: missing < numbers < strings"""
+    if value is None or value == '':
+        return (0, 0, '')
+    if isinstance(value, bool):
+        return (1, int(value), '')
+    if isinstance(value, (int, float)):
+        return (1, value, '')
+    try:
+        return (1, float(value), '')
+    except (TypeError, ValueError):
+        return (2, 0, str(value))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by encode_cursor(); raises ValueError for anything else"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    # binascii.Error, UnicodeDecodeError and JSONDecodeError are all ValueErrors
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def api_cursor_position(cursor):
+    """(sort value, id) position after which an /api page continues"""
+    try:
+        (rank, number, text), record_id = decode_cursor(cursor)
+    except TypeError:
+        raise ValueError('Invalid cursor')
+    if not (isinstance(rank, int) and isinstance(number, (int, float)) and isinstance(text, str)
+            and isinstance(record_id, str)):
+        raise ValueError('Invalid cursor')
+    return (rank, number, text), record_id
+
+
+def api_orders_cursor_position(cursor):
+    """(orderDate, order id) position after which an /api/orders newest-first page continues"""
+    try:
+        order_date, order_id = decode_cursor(cursor)
+    except TypeError:
+        raise ValueError('Invalid cursor')
+    if not (isinstance(order_date, (int, float)) and isinstance(order_id, str)):
+        raise ValueError('Invalid cursor')
+    return order_date, order_id
+
+
+def api_filter_matches(value, wanted):
+    """Exact-match filter on the string form; numbers compare by value, so Price=10 matches 10.0"""
+    text = str(value)
+    if text == wanted:
+        return True
+    try:
+        return float(text) == float(wanted)
+    except ValueError:
+        return False
+
+
+def project(record_id, record, fields):
+    """Keep only the requested fields (plus the id)"""
+    if not fields:
+        return {'id': record_id, **record}
+    return {'id': record_id, **{field: record.get(field) for field in fields if field in record}}
+
+
+def api_response(payload):
+    """Compact JSON response with an ETag and conditional GET support"""
+    body = json.dumps(payload, separators=(',', ':'), default=str)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def api_orders_page(limit, before, status, fields):
+    """Orders sorted newest first are paged with orderDate queries instead of a full read"""
+    orders, _, older = fetch_orders_page(limit, before=before, status=status)
+    data = [project(order_id, order, fields) for order_id, order in orders.items()]
+    next_cursor = encode_cursor(list(older)) if older else None
+    return {'data': data, 'count': len(data), 'next_cursor': next_cursor}
+
+
+@app.route('/api', methods=['GET'])
+def api_index():
+    """List the available JSON collections"""
+    return api_response({'collections': {name: url_for('api_collection', collection=name)
+                                         for name in API_COLLECTIONS}})
+
+
+@app.route('/api/<collection>', methods=['GET'])
+def api_collection(collection):
+    """Paginated, filtered, sorted and field-projected JSON view of a collection.
+
+    Query parameters: limit, cursor (from next_cursor), sort (field, '-field' for
+    descending), fields (comma separated) and any other field=value pair as an
+    exact-match filter. A malformed cursor is answered with 400.
+    """
+    try:
+        if collection not in API_COLLECTIONS:
+            return api_response({'error': f'Unknown collection {collection}'}), 404
+
+        limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        fields = [field for field in request.args.get('fields', '').split(',') if field]
+        filters = {key: value for key, value in request.args.items() if key not in API_RESERVED_ARGS}
+        sort = request.args.get('sort', '-orderDate' if collection == 'orders' else 'id')
+        descending = sort.startswith('-')
+        sort_field = sort.lstrip('-')
+
+        # Newest-first orders (optionally by status) only need one page from Firebase
+        orders_page = collection == 'orders' and sort == '-orderDate' and set(filters) <= {'status'}
+        position = None
+        if cursor:
+            try:
+                position = api_orders_cursor_position(cursor) if orders_page else api_cursor_position(cursor)
+            except ValueError:
+                return api_response({'error': 'Invalid cursor'}), 400
+        if orders_page:
+            return api_response(api_orders_page(limit, position, filters.get('status'), fields))
+
+        rows = api_rows(collection)
+        rows = [(record_id, record) for record_id, record in rows
+                if all(api_filter_matches(record.get(key, record_id if key == 'id' else ''), value)
+                       for key, value in filters.items())]
+
+        def sort_key(row):
+            value = row[0] if sort_field == 'id' else row[1].get(sort_field)
+            return (api_sort_value(value), row[0])
+
+        # Keyset pagination over (sort value, id)
+        if position:
+            rows = [row for row in rows if (sort_key(row) < position if descending else sort_key(row) > position)]
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        page = pick(limit + 1, rows, key=sort_key)
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last_value, last_id = sort_key(page[-1])
+            next_cursor = encode_cursor([list(last_value), last_id])
+
+        data = [project(record_id, record, fields) for record_id, record in page]
+        return api_response({'data': data, 'count': len(data), 'next_cursor': next_cursor})
+    except Exception as e:
+        print(f"Error in API for {collection}: {e}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        return api_response({'error': str(e)}), 500
+
+
+#################################################################################################################################
+#                                         APPLICATION FACTORY                                                                   #
+#################################################################################################################################
+
+
+def init_firebase(config):
+    """Initialize the default Firebase app once per process"""
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        cred = credentials.Certificate(config['FIREBASE_CREDENTIALS'])
+        return firebase_admin.initialize_app(cred, {
+            'databaseURL': config['FIREBASE_DATABASE_URL'],
+            'httpTimeout': config['FIREBASE_HTTP_TIMEOUT'],
+        })
+
+
+def create_app(config=None):
+    """Configure the admin app, initialize Firebase and index the upload folder.
+
+    Safe to call once in a pre-forking master: it opens no connections and starts no
+    threads. Call start_background_tasks() in each serving process afterwards.
+    """
+    if config:
+        app.config.update(config)
+
+    init_firebase(app.config)
+    configure_firebase_transport(app.config)
+
+    image_resolver.folder = app.config['UPLOAD_FOLDER']
+    image_resolver.scan()
+    static_assets.folder = app.static_folder
+    static_assets.build()
+    return app
+
+
+background_tasks_pid = None  # Process that owns the running background tasks
+background_tasks_lock = threading.Lock()
+
+
+def start_background_tasks():
+    """Start per-process background work (coupon scheduler, live mirror listeners), once per process"""
+    global database_mirror, background_tasks_pid
+    with background_tasks_lock:
+        if background_tasks_pid == os.getpid():
+            return
+        background_tasks_pid = os.getpid()
+        coupon_scheduler.start()
+        if app.config['FIREBASE_MIRROR']:
+            database_mirror = DatabaseMirror(MIRROR_PATHS)
+            # Subscribe once; reads fall back to the cache until each snapshot lands
+            database_mirror.start()
+
+
+def stop_background_tasks():
+    """Stop per-process background work before the process exits"""
+    global database_mirror, background_tasks_pid
+    with background_tasks_lock:
+        coupon_scheduler.stop()
+        if database_mirror is not None:
+            database_mirror.stop()
+            database_mirror = None
+        background_tasks_pid = None
+
+
+
+@app.before_request
+def ensure_background_tasks():
+    """Start background work lazily in servers that do not call start_background_tasks()"""
+    if background_tasks_pid != os.getpid():
+        start_background_tasks()
 
 
 if __name__ == "__main__":
+    create_app()
+    start_background_tasks()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""Gunicorn settings for the admin dashboard.
+
+Every value can be overridden from the environment, e.g.
+    WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+Send SIGHUP to the master to reload workers gracefully.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Worker processes x threads; Firebase reads are I/O bound so threads go a long way.
+# Caches are per worker: other workers see admin writes only after the TTLs listed in the
+# README (Production Deployment). Use WEB_CONCURRENCY=1 with more threads to avoid that.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+
+# Load the app (credentials, Firebase app, image index) once in the master before forking
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Graceful restarts and worker recycling
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+
+
+def post_fork(server, worker):
+    """Start listener threads in each worker; threads do not survive the fork"""
+    from firebase_admin_controller import start_background_tasks
+    start_background_tasks()
+
+
+def worker_exit(server, worker):
+    from firebase_admin_controller import stop_background_tasks
+    stop_background_tasks()
@@ -0,0 +1,68 @@
+"""/api/<collection> paging and filtering against the in-memory database from benchmark.py"""
+import base64
+
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+@pytest.fixture
+def client(monkeypatch):
+    items = {
+        'fruits': {
+            'apple': {'Name': 'Apple', 'Price': 10.0},
+            'mango': {'Name': 'Mango', 'Price': 12},
+            'lime': {'Name': 'Lime', 'Price': '10'},
+        },
+    }
+    orders = {f'o{index}': {'orderDate': 1700000000000 + index, 'status': 'PAID' if index % 2 else 'PENDING'}
+              for index in range(5)}
+    database = benchmark.FakeDatabase({'Data': {'CategoriesItems': items, 'OrderBills': orders}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    yield controller.app.test_client()
+    controller.firebase_cache.clear()
+
+
+def ids(response):
+    return [row['id'] for row in response.get_json()['data']]
+
+
+def test_numeric_filters_compare_by_value(client):
+    assert ids(client.get('/api/items?Price=10')) == ['fruits/apple', 'fruits/lime']
+    assert ids(client.get('/api/items?Price=12.0')) == ['fruits/mango']
+    assert ids(client.get('/api/items?Name=Apple')) == ['fruits/apple']
+    assert ids(client.get('/api/items?Name=10')) == []
+
+
+def test_cursor_pages_through_a_collection(client):
+    first = client.get('/api/items?sort=Name&limit=2').get_json()
+    second = client.get(f"/api/items?sort=Name&limit=2&cursor={first['next_cursor']}").get_json()
+
+    assert [row['id'] for row in first['data'] + second['data']] == ['fruits/apple', 'fruits/lime', 'fruits/mango']
+    assert second['next_cursor'] is None
+
+
+def test_cursor_pages_through_newest_orders(client):
+    first = client.get('/api/orders?limit=3').get_json()
+    second = client.get(f"/api/orders?limit=3&cursor={first['next_cursor']}").get_json()
+
+    assert [row['id'] for row in first['data'] + second['data']] == ['o4', 'o3', 'o2', 'o1', 'o0']
+
+
+def encoded(text):
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!', 'A', encoded('{not json'), encoded('\xff'), encoded('42'), encoded('"ab"'),
+    encoded('[[1, 2], "x"]'), encoded('[["a", "b", "c"], "x"]'), encoded('{"a": 1, "b": 2}'),
+])
+@pytest.mark.parametrize('url', ['/api/items?sort=Name', '/api/orders', '/api/orders?status=PAID'])
+def test_malformed_cursor_is_a_bad_request(client, url, cursor):
+    response = client.get(f'{url}&cursor={cursor}' if '?' in url else f'{url}?cursor={cursor}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
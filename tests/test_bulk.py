@@ -0,0 +1,50 @@
+"""POST /items/bulk validation"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+@pytest.fixture
+def database(monkeypatch):
+    items = {'fruits': {'apple': {'Price': 1, 'Inventory': 5}}}
+    database = benchmark.FakeDatabase({'Data': {'CategoriesItems': items}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    monkeypatch.setattr(controller, 'write_listeners', [])
+    controller.firebase_cache.clear()
+    yield database
+    controller.firebase_cache.clear()
+
+
+@pytest.fixture
+def client(database):
+    return controller.app.test_client()
+
+
+def test_updates_every_row(client, database):
+    response = client.post('/items/bulk', json={'items': [{'id': 'fruits/apple', 'Price': '2.5', 'Inventory': 7}]})
+
+    assert response.status_code == 200 and response.get_json() == {'updated': 1}
+    assert database.data['Data']['CategoriesItems']['fruits']['apple'] == {'Price': 2.5, 'Inventory': 7}
+
+
+@pytest.mark.parametrize('body', [None, [], ['x'], {'items': []}, {'items': {'fruits/apple': {'Price': 2}}},
+                                  {'items': 'fruits/apple'}])
+def test_malformed_bodies_are_rejected(client, database, body):
+    response = client.post('/items/bulk', json=body)
+
+    assert response.status_code == 400
+    assert database.calls['update'] == 0
+
+
+def test_bad_rows_are_reported_and_nothing_is_written(client, database):
+    response = client.post('/items/bulk', json={'items': [
+        {'id': 'fruits/apple', 'Price': 3}, 'x', None, {'id': 'apple', 'Price': 1},
+        {'id': 'fruits/apple', 'Price': -1}]})
+
+    assert response.status_code == 400
+    assert [(row['row'], row['error']) for row in response.get_json()['rows']] == [
+        (2, 'Each row must be an object'), (3, 'Each row must be an object'),
+        (4, 'id must be <category_id>/<item_id>'), (5, 'Price cannot be negative')]
+    assert database.calls['update'] == 0
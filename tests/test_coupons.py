@@ -0,0 +1,61 @@
+"""CouponIndex reloads and the CouponScheduler purge"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+def coupon(coupon_id, start, end):
+    return {'Id': coupon_id, 'startDate': start, 'endDate': end, 'productId': 'fruits/apple'}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = benchmark.FakeDatabase({'Data': {'Coupons': {'c1': coupon('c1', '2024-01-01', '2024-12-31')}}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    yield database
+    controller.firebase_cache.clear()
+
+
+@pytest.fixture
+def index(database, monkeypatch):
+    index = controller.CouponIndex()
+    monkeypatch.setattr(controller, 'write_listeners', [index.on_write])
+    return index
+
+
+def test_coupon_written_during_build_is_indexed(database, index, monkeypatch):
+    db_get = controller.db_get
+
+    def downloading(path):
+        value = db_get(path)
+        monkeypatch.setattr(controller, 'db_get', db_get)
+        controller.db_set('Data/Coupons/c2', coupon('c2', '2024-02-01', '2024-03-01'))
+        return value
+    monkeypatch.setattr(controller, 'db_get', downloading)
+
+    assert sorted(index.query('2024-06-01')) == ['c1', 'c2']
+    assert index.pending == set()
+
+
+def test_purge_skips_coupons_without_a_valid_end_date(database, index, monkeypatch):
+    database.data['Data']['Coupons'].update({
+        'old': coupon('old', '2023-01-01', '2023-02-01'),
+        'legacy': {'Id': 'legacy', 'startDate': '2023-01-01'},
+        'typo': coupon('typo', '2023-01-01', '31/01/2023'),
+    })
+    monkeypatch.setitem(controller.app.config, 'COUPON_PURGE_AFTER_DAYS', 30)
+    scheduler = controller.CouponScheduler(index)
+
+    assert scheduler.sweep('2024-06-01') == ['old']
+    assert sorted(database.data['Data']['Coupons']) == ['c1', 'legacy', 'typo']
+
+
+def test_root_write_reloads_the_index(database, index):
+    index.query('2024-06-01')
+
+    controller.notify_write('/', None)
+
+    assert index.pending == {None}
@@ -0,0 +1,83 @@
+"""DashboardCounters kept current by write notifications, including writes made during a rebuild"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+def tree():
+    return {'Data': {
+        'OrderBills': {
+            'o1': {'status': 'PAID', 'orderDate': 1700000000000, 'totalPrice': 10},
+            'o2': {'status': 'PENDING', 'orderDate': 1700000000000, 'totalPrice': 5},
+        },
+        'CategoriesItems': {'fruits': {'apple': {'Inventory': 3}, 'mango': {'Inventory': 50}}},
+    }}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = benchmark.FakeDatabase(tree())
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    yield database
+    controller.firebase_cache.clear()
+
+
+@pytest.fixture
+def counters(database, monkeypatch):
+    counters = controller.DashboardCounters(low_inventory=10)
+    monkeypatch.setattr(controller, 'write_listeners', [counters.on_write])
+    return counters
+
+
+def during_next_build(monkeypatch, write):
+    """Run write() after the next build() has started its download"""
+    db_get_all = controller.db_get_all
+
+    def downloading(*paths):
+        values = db_get_all(*paths)
+        monkeypatch.setattr(controller, 'db_get_all', db_get_all)
+        write()
+        return values
+    monkeypatch.setattr(controller, 'db_get_all', downloading)
+
+
+def test_writes_are_applied_incrementally(database, counters):
+    assert counters.summary()['orders']['PAID'] == 1
+
+    database.reference('Data/OrderBills/o2/status').set('PAID')
+    controller.notify_write('Data/OrderBills/o2/status', 'PAID')
+    controller.firebase_cache.clear()
+
+    kpis = counters.summary()
+    assert kpis['orders']['PAID'] == 2 and kpis['orders']['PENDING'] == 0
+    assert kpis['low_inventory']['items'] == 1
+
+
+def test_root_write_during_build_reloads_everything(database, counters, monkeypatch):
+    updated = tree()
+    updated['Data']['OrderBills']['o3'] = {'status': 'PAID', 'orderDate': 1700000000000, 'totalPrice': 7}
+
+    def replace_root():
+        database.reference('/').set(updated)
+        controller.notify_write('/', updated)
+    during_next_build(monkeypatch, replace_root)
+
+    assert counters.summary()['orders']['total'] == 2  # Built from the download that started first
+    assert counters.pending == {None}
+    controller.firebase_cache.clear()
+
+    assert counters.summary()['orders']['total'] == 3
+    assert counters.pending == set()
+
+
+def test_order_written_during_build_is_reread(database, counters, monkeypatch):
+    def pay_o2():
+        database.reference('Data/OrderBills/o2/status').set('PAID')
+        controller.notify_write('Data/OrderBills/o2/status', 'PAID')
+        controller.firebase_cache.clear()
+    during_next_build(monkeypatch, pay_o2)
+
+    assert counters.summary()['orders']['PAID'] == 2
@@ -0,0 +1,51 @@
+"""Streamed exports keep going past malformed records"""
+import json
+
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+@pytest.fixture
+def client(monkeypatch):
+    database = benchmark.FakeDatabase({'Data': {
+        'Categories': {'fruits': {'Id': 'fruits', 'Name': 'Fruits'}},
+        'CategoriesItems': {'fruits': {'apple': {'Name': 'Apple', 'Price': 2, 'Unit': 'kg', 'Image': ''}}},
+        'SoldItems': {
+            '2024-05-01': {
+                's1': {'Id': 'fruits/apple', 'Sales': 3},
+                's2': {'Id': 'apple', 'Sales': 1},
+                's3': {'Id': 'fruits/apple/extra', 'Sales': 1},
+                's4': {'Sales': 1},
+                's5': 'not a sale',
+            },
+            '2024-05-02': {'s1': {'Id': 'fruits/apple', 'Sales': 2}},
+        },
+    }})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    yield controller.app.test_client()
+    controller.firebase_cache.clear()
+
+
+def test_sold_items_export_marks_malformed_ids_and_finishes(client):
+    response = client.get('/export/sold-items.ndjson')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.status_code == 200
+    assert [(row['date'], row['productId'], row['itemName'], row['revenue']) for row in rows] == [
+        ('2024-05-01', 'fruits/apple', 'Apple', 6.0),
+        ('2024-05-01', 'apple', 'Unknown Item', 0.0),
+        ('2024-05-01', 'fruits/apple/extra', 'Unknown Item', 0.0),
+        ('2024-05-01', '', 'Unknown Item', 0.0),
+        ('2024-05-02', 'fruits/apple', 'Apple', 4.0),
+    ]
+
+
+def test_sold_items_page_renders_malformed_ids(client):
+    response = client.get('/sold-items/2024-05-01')
+
+    assert response.status_code == 200
+    assert 'Unknown Item' in response.get_data(as_text=True)
@@ -0,0 +1,52 @@
+"""LikesLeaderboard counts kept current from Data/LikedItems writes"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+def like(product_id):
+    return {'Id': product_id, 'Name': product_id.split('/')[1].title(), 'Price': 1}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = benchmark.FakeDatabase({'Data': {'LikedItems': {
+        'u1': {'a': like('fruits/apple'), 'm': like('fruits/mango')},
+        'u2': {'a': like('fruits/apple')},
+    }}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    yield database
+    controller.firebase_cache.clear()
+
+
+@pytest.fixture
+def leaderboard(database, monkeypatch):
+    leaderboard = controller.LikesLeaderboard()
+    monkeypatch.setattr(controller, 'write_listeners', [leaderboard.on_write])
+    return leaderboard
+
+
+def test_counts_follow_writes(leaderboard):
+    assert [(row['productId'], row['likes']) for row in leaderboard.top_products()] == [
+        ('fruits/apple', 2), ('fruits/mango', 1)]
+
+    controller.db_delete('Data/LikedItems/u1/a')
+
+    assert leaderboard.totals() == {'likes': 2, 'products': 2, 'users': 2}
+
+
+def test_like_written_during_build_is_counted(leaderboard, monkeypatch):
+    db_get = controller.db_get
+
+    def downloading(path):
+        value = db_get(path)
+        monkeypatch.setattr(controller, 'db_get', db_get)
+        controller.db_set('Data/LikedItems/u3', {'m': like('fruits/mango')})
+        return value
+    monkeypatch.setattr(controller, 'db_get', downloading)
+
+    assert leaderboard.totals() == {'likes': 4, 'products': 2, 'users': 3}
+    assert leaderboard.pending == set()
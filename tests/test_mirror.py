@@ -0,0 +1,140 @@
+"""DatabaseMirror fed by the in-memory database from benchmark.py"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+def orders():
+    return {
+        'o1': {'orderBillId': 'o1', 'status': 'PENDING', 'totalPrice': 10},
+        'o2': {'orderBillId': 'o2', 'status': 'PAID', 'totalPrice': 25},
+    }
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = benchmark.FakeDatabase({'Data': {'OrderBills': orders(), 'Users': {'u1': {'name': 'An'}}}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    controller.firebase_cache.clear()
+    yield database
+    controller.firebase_cache.clear()
+
+
+@pytest.fixture
+def notified(monkeypatch):
+    """Writes the mirror passes on to the indexes, as (path, value, merge)"""
+    writes = []
+    monkeypatch.setattr(controller, 'write_listeners', [lambda path, value, merge: writes.append((path, value, merge))])
+    return writes
+
+
+class Stream:
+    """listen() stand-in that keeps the callbacks so tests decide when events arrive"""
+
+    def __init__(self):
+        self.callbacks = {}
+
+    def __call__(self, path, callback):
+        self.callbacks[path] = callback
+
+    def send(self, root, event_type, path, data):
+        self.callbacks[root](benchmark.Event(event_type, path, data))
+
+
+def test_initial_snapshot_marks_roots_ready(database, notified):
+    mirror = controller.DatabaseMirror(['Data/OrderBills', '/Data/Users/'], listen=database.listen)
+    mirror.start()
+
+    assert mirror.ready
+    assert mirror.get('Data/OrderBills') == orders()
+    assert mirror.get('Data/Users/u1/name') == 'An'
+    assert mirror.covers('Data/OrderBills/o1/status')
+    assert not mirror.covers('Data/Coupons')
+    assert ('Data/OrderBills', orders(), False) in notified
+
+
+def test_put_and_patch_events_are_applied(database, notified):
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=database.listen)
+    mirror.start()
+    del notified[:]
+
+    database.reference('Data/OrderBills/o3').set({'orderBillId': 'o3', 'status': 'PENDING', 'totalPrice': 7})
+    database.reference('Data/OrderBills/o1').update({'status': 'PAID', 'paidAt': '2024-05-01'})
+    database.reference('Data/OrderBills/o2').delete()
+
+    assert mirror.get('Data/OrderBills') == {
+        'o1': {'orderBillId': 'o1', 'status': 'PAID', 'totalPrice': 10, 'paidAt': '2024-05-01'},
+        'o3': {'orderBillId': 'o3', 'status': 'PENDING', 'totalPrice': 7},
+    }
+    assert [(path, merge) for path, _, merge in notified] == [
+        ('Data/OrderBills/o3', False), ('Data/OrderBills/o1', True), ('Data/OrderBills/o2', False)]
+    assert mirror.status()['events'] == 4
+
+
+def test_returned_values_are_copies(database):
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=database.listen)
+    mirror.start()
+
+    mirror.get('Data/OrderBills/o1')['status'] = 'CANCELLED'
+    assert mirror.get('Data/OrderBills/o1/status') == 'PENDING'
+
+
+def test_snapshot_after_reconnect_replaces_the_mirrored_tree(database, notified):
+    stream = Stream()
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=stream)
+    mirror.start()
+    stream.send('Data/OrderBills', 'put', '/', orders())
+
+    # While disconnected, o1 was deleted and o4 added; the SDK resends the whole root on reconnect
+    resynced = {'o2': orders()['o2'], 'o4': {'orderBillId': 'o4', 'status': 'PENDING', 'totalPrice': 3}}
+    stream.send('Data/OrderBills', 'put', '/', resynced)
+
+    assert mirror.get('Data/OrderBills') == resynced
+    assert mirror.get('Data/OrderBills/o1') is None
+    assert notified[-1] == ('Data/OrderBills', resynced, False)
+
+
+def test_reads_fall_back_to_the_network_until_the_first_snapshot(database, notified, monkeypatch):
+    stream = Stream()
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=stream)
+    mirror.start()
+    monkeypatch.setattr(controller, 'database_mirror', mirror)
+
+    assert not mirror.ready
+    assert not mirror.covers('Data/OrderBills')
+    assert controller.db_get('Data/OrderBills/o2/status') == 'PAID'
+    assert controller.db_keys('Data/OrderBills') == ['o1', 'o2']
+    assert database.calls['get'] == 1 and database.calls['shallow'] == 1
+
+    # Local writes are not mirrored before the snapshot either
+    mirror.apply_write('Data/OrderBills/o1/status', 'PAID')
+    assert mirror.get('Data/OrderBills') is None
+
+    stream.send('Data/OrderBills', 'put', '/', orders())
+    database.reset_counters()
+
+    assert controller.db_get('Data/OrderBills/o1/status') == 'PENDING'
+    assert controller.db_keys('Data/OrderBills') == ['o1', 'o2']
+    assert sum(database.calls.values()) == 0
+
+
+def test_local_writes_show_up_before_the_stream_echoes_them(database):
+    stream = Stream()
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=stream)
+    mirror.start()
+    stream.send('Data/OrderBills', 'put', '/', orders())
+
+    mirror.apply_write('Data/OrderBills/o1', {'status': 'PAID'}, merge=True)
+    mirror.apply_write('Data/OrderBills/o2', None)
+
+    assert mirror.get('Data/OrderBills') == {'o1': {'orderBillId': 'o1', 'status': 'PAID', 'totalPrice': 10}}
+
+
+def test_stop_closes_listeners_and_falls_back(database):
+    mirror = controller.DatabaseMirror(['Data/OrderBills'], listen=database.listen)
+    mirror.start()
+    mirror.stop()
+
+    assert database.listeners == []
+    assert not mirror.covers('Data/OrderBills')
@@ -0,0 +1,166 @@
+"""Keyset paging of orders and reviews, read with queries and from the live mirror"""
+import pytest
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+def tree():
+    orders = {f'o{index:02d}': {'orderDate': 1700000000000 + index * 1000,
+                                'status': 'PAID' if index % 3 == 0 else 'PENDING'}
+              for index in range(20)}
+    orders['o99'] = 'not an order'
+    reviews = {f'r{index:02d}': {'timestamp': 1700000000000 + index, 'rating': 4, 'comment': f'review {index}'}
+               for index in range(7)}
+    return {'Data': {'OrderBills': orders, 'Reviews': {'fruits': {'apple': reviews}}}}
+
+
+@pytest.fixture(params=['query', 'mirror'])
+def database(request, monkeypatch):
+    database = benchmark.FakeDatabase(tree())
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'write_listeners', [])
+    mirror = None
+    if request.param == 'mirror':
+        mirror = controller.DatabaseMirror(['Data/OrderBills', 'Data/Reviews'], listen=database.listen)
+        mirror.start()
+    monkeypatch.setattr(controller, 'database_mirror', mirror)
+    return database
+
+
+def walk(fetch, page_size):
+    """Page to the end and back again; returns the ids seen going older and going newer"""
+    older_ids, newer_ids = [], []
+    page, newer, older = fetch(page_size)
+    older_ids.extend(page)
+    while older:
+        page, newer, older = fetch(page_size, before=older)
+        older_ids.extend(page)
+    while newer:
+        page, newer, _ = fetch(page_size, after=newer)
+        newer_ids[:0] = page
+    return older_ids, newer_ids
+
+
+def test_orders_page_newest_first_in_both_directions(database):
+    expected = [f'o{index:02d}' for index in range(19, -1, -1)]
+
+    older_ids, newer_ids = walk(controller.fetch_orders_page, 6)
+
+    assert older_ids == expected
+    assert newer_ids == expected[:-2]  # Everything newer than the last page
+
+
+def test_orders_status_filter_pages_through_matches_only(database):
+    expected = [f'o{index:02d}' for index in range(18, -1, -3)]
+
+    older_ids, _ = walk(lambda size, **cursors: controller.fetch_orders_page(size, status='PAID', **cursors), 2)
+
+    assert older_ids == expected
+
+
+def test_reviews_page_like_orders(database):
+    expected = [f'r{index:02d}' for index in range(6, -1, -1)]
+
+    older_ids, newer_ids = walk(lambda size, **cursors: controller.fetch_reviews_page('fruits', 'apple', size,
+                                                                                      **cursors), 3)
+
+    assert older_ids == expected
+    assert newer_ids == expected[:-1]
+
+
+def test_cursor_args_round_trip_through_the_query_string():
+    assert controller.keyset_cursor_args('before', (1700000000000.0, 'o01')) == {
+        'before': 1700000000000, 'before_id': 'o01'}
+    assert controller.keyset_cursor_args('after', (12.5, 'r1')) == {'after': 12.5, 'after_id': 'r1'}
+    assert controller.keyset_cursor_args('after', None) is None
+
+
+def test_review_stats_keep_unrated_reviews_out_of_the_average():
+    summary = controller.ReviewStats.summarize_item({
+        'r1': {'rating': 5, 'timestamp': 1},
+        'r2': {'rating': '3', 'timestamp': 2},
+        'r3': {'timestamp': 3, 'comment': 'no stars'},
+        'r4': {'rating': 'great', 'timestamp': 4},
+        'r5': {'rating': 0, 'timestamp': 5},
+    })
+
+    assert summary['count'] == 5
+    assert summary['unrated'] == 3
+    assert summary['average'] == 4.0
+    assert summary['histogram'] == [0, 0, 1, 0, 1]
+
+
+def test_review_stats_without_any_rating():
+    summary = controller.ReviewStats.summarize_item({'r1': {'comment': 'hmm', 'timestamp': 1}})
+
+    assert summary['count'] == summary['unrated'] == 1
+    assert summary['average'] is None
+    assert summary['histogram'] == [0] * 5
+    assert summary['latest']['comment'] == 'hmm'
+
+
+def test_review_posted_during_build_is_counted(database, monkeypatch):
+    stats = controller.ReviewStats()
+    monkeypatch.setattr(controller, 'write_listeners', [stats.on_write])
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    controller.firebase_cache.clear()
+    db_get = controller.db_get
+
+    def downloading(path):
+        value = db_get(path)
+        monkeypatch.setattr(controller, 'db_get', db_get)
+        controller.db_set('Data/Reviews/fruits/apple/r99', {'timestamp': 1800000000000, 'rating': 1})
+        return value
+    monkeypatch.setattr(controller, 'db_get', downloading)
+
+    summary = stats.item('fruits', 'apple')
+    assert summary['count'] == 8
+    assert summary['average'] == 3.6
+    assert stats.pending == set()
+
+
+@pytest.fixture
+def same_time(monkeypatch):
+    """12 orders and reviews placed in the same millisecond, plus one earlier and one later"""
+    orders = {f'o{index:02d}': {'orderDate': 1700000005000, 'status': 'PAID'} for index in range(12)}
+    orders['early'] = {'orderDate': 1700000000000, 'status': 'PAID'}
+    orders['late'] = {'orderDate': 1700000009000, 'status': 'PENDING'}
+    reviews = {f'r{index:02d}': {'timestamp': 1700000005000, 'rating': 5} for index in range(12)}
+    reviews['early'] = {'timestamp': 1700000000000, 'rating': 5}
+    database = benchmark.FakeDatabase({'Data': {'OrderBills': orders, 'Reviews': {'fruits': {'apple': reviews}}}})
+    monkeypatch.setattr(controller.db, 'reference', database.reference)
+    monkeypatch.setattr(controller, 'database_mirror', None)
+    monkeypatch.setattr(controller, 'write_listeners', [])
+    return database
+
+
+def test_export_scan_moves_past_a_run_of_equal_dates(same_time):
+    ids = [order_id for order_id, _ in controller.iter_orders(chunk_size=3)]
+
+    assert ids == ['early'] + [f'o{index:02d}' for index in range(12)] + ['late']
+
+
+def test_export_range_includes_orders_at_the_start(same_time):
+    ids = [order_id for order_id, _ in controller.iter_orders(1700000005000, 1700000005000, chunk_size=4)]
+
+    assert ids == [f'o{index:02d}' for index in range(12)]
+
+
+def test_order_pages_move_past_a_run_of_equal_dates(same_time, monkeypatch):
+    monkeypatch.setattr(controller, 'ORDERS_SCAN_CHUNK', 3)
+    expected = ['late'] + [f'o{index:02d}' for index in range(11, -1, -1)] + ['early']
+
+    assert walk(controller.fetch_orders_page, 2)[0] == expected
+    assert walk(lambda size, **cursors: controller.fetch_orders_page(size, status='PAID', **cursors), 2)[0] == \
+        expected[1:]
+
+
+def test_review_pages_report_older_reviews_behind_equal_timestamps(same_time):
+    expected = [f'r{index:02d}' for index in range(11, -1, -1)] + ['early']
+
+    older_ids, newer_ids = walk(lambda size, **cursors: controller.fetch_reviews_page('fruits', 'apple', size,
+                                                                                      **cursors), 2)
+
+    assert older_ids == expected
+    assert newer_ids == expected[:-1]
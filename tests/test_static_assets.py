@@ -0,0 +1,74 @@
+"""Static file fingerprints used by url_for('static', ...)"""
+import os
+
+import pytest
+
+import firebase_admin_controller as controller
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: green; }\n' * 20)
+    assets = controller.StaticAssets(str(tmp_path))
+    assets.build()
+    return assets
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """Count os.stat calls made by the controller"""
+    calls = []
+    real_stat = os.stat
+
+    def stat(path, *args, **kwargs):
+        calls.append(path)
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(controller.os, 'stat', stat)
+    return calls
+
+
+def test_digests_come_from_memory(assets, stats):
+    digest = assets.digest('css/site.css')
+
+    assert digest and assets.digest('css/site.css') == digest
+    assert stats == []
+
+
+def test_missing_files_are_checked_once_per_interval(assets, stats):
+    assert assets.digest('css/missing.css') is None
+    assert assets.digest('css/missing.css') is None
+    assert len(stats) == 1
+
+
+def test_replaced_files_get_a_new_digest_after_the_recheck_interval(assets, tmp_path, monkeypatch):
+    digest = assets.digest('css/site.css')
+    path = tmp_path / 'css' / 'site.css'
+    path.write_text('body { color: red; }\n' * 30)
+
+    assert assets.digest('css/site.css') == digest
+    monkeypatch.setattr(controller, 'STATIC_RECHECK_INTERVAL', 0)
+    assert assets.digest('css/site.css') not in (None, digest)
+
+
+def test_invalidate_rechecks_a_file_right_away(assets, tmp_path):
+    digest = assets.digest('css/site.css')
+    path = tmp_path / 'css' / 'site.css'
+    path.write_text('body { color: red; }\n' * 30)
+    assets.invalidate(str(path))
+
+    assert assets.digest('css/site.css') not in (None, digest)
+
+    path.unlink()
+    assets.invalidate(str(path))
+    assert assets.digest('css/site.css') is None
+
+
+def test_url_for_appends_the_digest(monkeypatch, assets):
+    monkeypatch.setattr(controller, 'static_assets', assets)
+
+    with controller.app.test_request_context():
+        url = controller.url_for('static', filename='css/site.css')
+
+    assert url == f"/static/css/site.css?v={assets.digest('css/site.css')}"
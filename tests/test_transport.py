@@ -0,0 +1,174 @@
+"""FirebaseTransport against a local stand-in for the Realtime Database REST API.
+
+The Admin SDK is pointed at the server through FIREBASE_DATABASE_EMULATOR_HOST, so these
+tests also fail if an SDK release stops routing database calls through the session we tune.
+"""
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import firebase_admin
+import pytest
+from firebase_admin import db
+
+import benchmark
+import firebase_admin_controller as controller
+
+
+class FakeDatabaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data):
+        super().__init__(('127.0.0.1', 0), FakeDatabaseHandler)
+        self.data = data
+        self.lock = threading.Lock()
+        self.failures = 0  # Answer this many requests with 503 before serving again
+        self.delay = 0.0
+        self.requests = []  # (Accept-Encoding, Connection) per request
+        self.connections = 0
+
+    @property
+    def host(self):
+        return f'127.0.0.1:{self.server_port}'
+
+
+class FakeDatabaseHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real database
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.headers.get('Accept-Encoding'), self.headers.get('Connection')))
+            failing = server.failures > 0
+            if failing:
+                server.failures -= 1
+        if failing:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(server.delay)
+
+        path = self.path.split('?', 1)[0]
+        node = server.data
+        for part in path[:-len('.json')].strip('/').split('/'):
+            if part:
+                node = node.get(part) if isinstance(node, dict) else None
+        body = json.dumps(node).encode()
+        compressed = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if compressed:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = FakeDatabaseServer({'Data': {'Categories': {'fruits': {'Id': 'fruits', 'Name': 'Fruits'}}}})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def firebase(server, monkeypatch):
+    """Initialize the default Firebase app the way create_app() does, against the local server"""
+    monkeypatch.setenv('FIREBASE_DATABASE_EMULATOR_HOST', server.host)
+    monkeypatch.setattr(controller.credentials, 'Certificate', lambda path: benchmark.BenchmarkCredential())
+    config = dict(controller.app.config,
+                  FIREBASE_DATABASE_URL=f'http://{server.host}?ns=agradmin-test',
+                  FIREBASE_HTTP_TIMEOUT=2.0, FIREBASE_POOL_SIZE=2,
+                  FIREBASE_RETRIES=3, FIREBASE_RETRY_BACKOFF=0.01)
+    app = controller.init_firebase(config)
+
+    def configure(**overrides):
+        config.update(overrides)
+        return controller.configure_firebase_transport(config)
+
+    yield configure
+    controller.firebase_transport = None
+    firebase_admin.delete_app(app)
+
+
+def retries_counted():
+    return sum(controller.metrics.counters.get('agradmin_firebase_retries_total', {}).values())
+
+
+def test_reads_go_through_the_tuned_transport(server, firebase):
+    transport = firebase()
+    assert isinstance(transport, controller.FirebaseTransport)
+
+    assert db.reference('Data/Categories/fruits/Name').get() == 'Fruits'
+
+    assert transport.stats()['requests'] == 1
+    accept_encoding, connection = server.requests[-1]
+    assert accept_encoding == 'gzip'
+    assert (connection or 'keep-alive').lower() == 'keep-alive'
+
+
+def test_connections_are_reused_and_bounded(server, firebase):
+    transport = firebase(FIREBASE_POOL_SIZE=2)
+    server.delay = 0.05
+
+    with ThreadPoolExecutor(8) as executor:
+        names = list(executor.map(lambda _: db.reference('Data/Categories/fruits/Name').get(), range(24)))
+
+    assert names == ['Fruits'] * 24
+    stats = transport.stats()
+    assert stats['requests'] == 24
+    assert stats['peak_in_flight'] > 2  # Callers queued for the pool rather than failing
+    assert server.connections <= 2
+    assert [pool['connections_opened'] for pool in stats['pools']] == [server.connections]
+
+
+def test_server_errors_are_retried(server, firebase):
+    firebase(FIREBASE_RETRIES=3)
+    server.failures = 2
+    before = retries_counted()
+
+    assert db.reference('Data/Categories/fruits').get() == {'Id': 'fruits', 'Name': 'Fruits'}
+
+    assert retries_counted() - before == 2
+    assert len(server.requests) == 3
+
+
+def test_exhausted_retries_raise_the_sdk_error(server, firebase):
+    transport = firebase(FIREBASE_RETRIES=1)
+    server.failures = 5
+
+    with pytest.raises(firebase_admin.exceptions.FirebaseError):
+        db.reference('Data/Categories').get()
+    assert len(server.requests) == 2
+    assert transport.stats()['in_flight'] == 0
+
+
+def test_warns_when_the_sdk_session_is_unavailable(firebase, monkeypatch, caplog):
+    monkeypatch.setattr(controller.db, 'reference', lambda path='/': object())
+
+    with caplog.at_level('WARNING'):
+        assert firebase() is None
+    assert 'Firebase transport not configured' in caplog.text
+    assert controller.firebase_transport is None
+
+
+def test_can_be_switched_off(firebase):
+    assert firebase(FIREBASE_TUNED_TRANSPORT=False) is None
+    assert controller.firebase_transport is None
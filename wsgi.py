@@ -0,0 +1,8 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    waitress-serve --threads=16 wsgi:app    (Windows)
+"""
+from firebase_admin_controller import create_app
+
+app = create_app()